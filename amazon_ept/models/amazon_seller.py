@@ -158,6 +158,9 @@ class AmazonSellerEpt(models.Model):
                                            string='Auto Workflow (FBA)',
                                            default=_get_default_fba_auto_workflow)
     fulfillment_latency = fields.Integer('Fullfillment Latency', default=3)
+    fbm_queue_line_limit = fields.Integer("FBM Order Queue Size", default=100,
+                                          help="Maximum number of orders stored in one shipped or unshipped "
+                                               "FBM order queue")
     shipment_charge_product_id = fields.Many2one(PRODUCT_PRODUCT, "Shipment Fee",
                                                  domain=[('type', '=', 'service')],
                                                  default=_get_default_shipment_amazon_fee)
@@ -769,8 +772,10 @@ class AmazonSellerEpt(models.Model):
         if seller_id:
             seller = self.browse(int(seller_id))
             if seller:
+                # Instances of the seller mostly share warehouses, so the stock is computed once for the run.
+                amazon_product_obj = amazon_product_obj.with_context(is_auto_process=True, stock_qty_cache_ept={})
                 for instance in seller.instance_ids:
-                    amazon_product_obj.with_context(is_auto_process=True).export_amazon_stock_levels_operation(instance)
+                    amazon_product_obj.export_amazon_stock_levels_operation(instance)
                     instance.write({'inventory_last_sync_on': datetime.now()})
         return True
 
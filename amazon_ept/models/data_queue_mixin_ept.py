@@ -14,5 +14,5 @@ class DataQueueMixinEpt(models.AbstractModel):
         """
         if not queue_data:
             queue_data = []
-        queue_data += ["common_log_lines_ept"]
+        queue_data += ["common_log_lines_ept", "shipped_order_data_queue_ept", "shipped_order_data_queue_line_ept"]
         return super(DataQueueMixinEpt, self).delete_data_queue_ept(queue_data, is_delete_queue)
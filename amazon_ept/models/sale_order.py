@@ -1807,29 +1807,50 @@ class SaleOrder(models.Model):
 
     def create_shipped_or_missing_unshipped_queue(self, datas, instance_dict, seller, data_queue):
         """
-        This method will create shipped and Un-Shipped orders data queue lines.
+        This method will create shipped and Un-Shipped orders data queue lines. Orders which are
+        already waiting in a draft queue line are skipped with one query for the whole page and
+        the new lines are created in one batch, a new queue is created when the current queue
+        reaches the seller queue size.
         :param: datas: list of amazon orders response
         :param: instance_dict: dict {}
         :param: seller: amazon.seller.ept()
         :param: data_queue: shipped.order.data.queue.ept()
-        :return: True
+        :return: shipped.order.data.queue.ept() used to store the orders, last one is the current queue
         """
         shipped_order_data_queue_line_obj = self.env['shipped.order.data.queue.line.ept']
+        queue_size = seller.fbm_queue_line_limit or 100
+        pending_orders = shipped_order_data_queue_line_obj.amz_find_pending_queue_orders(
+            {data.get('AmazonOrderId') for data in datas if data.get('AmazonOrderId')})
+        vals_list = []
         for data in datas:
+            order_key = (data.get('AmazonOrderId', False), data.get('OrderStatus'))
+            if order_key in pending_orders:
+                continue
+            pending_orders.add(order_key)
             instance = instance_dict.get(data.get('SalesChannel', ''))
             if not instance:
                 instance = seller.mapped('instance_ids').filtered(
                     lambda l, data=data: l.marketplace_id.name == data.get('SalesChannel', ''))
                 instance_dict.update({data.get('SalesChannel', ''): instance})
-            shipped_order_data_queue_line_obj.create({
+            vals_list.append({
                 'order_id': data.get('AmazonOrderId', False),
                 'order_data_id': json.dumps(data),
                 'amz_instance_id': instance.id,
                 'last_process_date': datetime.now(),
-                'shipped_order_data_queue_id': data_queue.id,
                 'order_status': data.get('OrderStatus')
             })
-        return True
+        data_queues = data_queue
+        free_lines = queue_size - shipped_order_data_queue_line_obj.search_count(
+            [('shipped_order_data_queue_id', '=', data_queue.id)])
+        for vals in vals_list:
+            if free_lines <= 0:
+                data_queue = self.amz_create_shipped_unshipped_data_queue(seller)
+                data_queues |= data_queue
+                free_lines = queue_size
+            vals.update({'shipped_order_data_queue_id': data_queue.id})
+            free_lines -= 1
+        shipped_order_data_queue_line_obj.create(vals_list)
+        return data_queues
 
     def auto_process_shipped_order_queue_line(self, data_queue):
         """
@@ -1907,9 +1928,11 @@ class SaleOrder(models.Model):
         if not isinstance(datas, list) and datas:
             datas = [datas]
         if datas:
-            self.create_shipped_or_missing_unshipped_queue(datas, instance_dict, seller, data_queue)
+            data_queues = self.create_shipped_or_missing_unshipped_queue(datas, instance_dict, seller, data_queue)
+            data_queue_list += [queue_id for queue_id in data_queues.ids if queue_id not in data_queue_list]
+            data_queue = data_queues[-1]
             self._cr.commit()
-            self.auto_process_shipped_order_queue_line(data_queue)
+            self.auto_process_shipped_order_queue_line(data_queues[0])
             while True:
                 if not next_token:
                     break
@@ -1919,9 +1942,13 @@ class SaleOrder(models.Model):
                 if result:
                     for data in result:
                         datas = data.get('Orders', [])
-                        data_queue = self.amz_create_shipped_unshipped_data_queue(seller)
-                        data_queue_list.append(data_queue.id)
-                        self.create_shipped_or_missing_unshipped_queue(datas, instance_dict, seller, data_queue)
+                        if not datas:
+                            continue
+                        data_queues = self.create_shipped_or_missing_unshipped_queue(datas, instance_dict, seller,
+                                                                                     data_queue)
+                        data_queue_list += [queue_id for queue_id in data_queues.ids if
+                                            queue_id not in data_queue_list]
+                        data_queue = data_queues[-1]
                         self._cr.commit()
         return data_queue_list
 
@@ -20,6 +20,7 @@ class ShippedOrderDataQueue(models.Model):
     _description = 'Shipped Order Data Queue Ept'
     _inherit = ['mail.thread', 'mail.activity.mixin']
     _order = "create_date desc"
+    _queue_cleanup_ept = True
 
     def _compute_queue_line_record(self):
         """
@@ -15,10 +15,11 @@ class ShippedOrderDataQueueLine(models.Model):
     """
     _name = "shipped.order.data.queue.line.ept"
     _description = 'Shipped Order Data Queue Line Ept'
+    _queue_cleanup_ept = True
 
     amz_instance_id = fields.Many2one('amazon.instance.ept', string='Marketplace',
                                       help="Amazon Instance")
-    order_id = fields.Char()
+    order_id = fields.Char(index=True)
     state = fields.Selection([('draft', 'Draft'), ('failed', 'Failed'), ('done', 'Done')],
                              default='draft')
     last_process_date = fields.Datetime(readonly=True)
@@ -31,3 +32,16 @@ class ShippedOrderDataQueueLine(models.Model):
                                      ('InvoiceUnconfirmed', 'InvoiceUnconfirmed'),
                                      ('PendingAvailability', 'PendingAvailability')], string="Order Status")
     order_data_id = fields.Char()
+
+    def amz_find_pending_queue_orders(self, order_refs):
+        """
+        Define this method for find the amazon orders which are already waiting in draft queue
+        lines with one query.
+        :param: order_refs: list of amazon order references
+        :return: set of tuple (amazon order reference, order status)
+        """
+        if not order_refs:
+            return set()
+        queue_lines = self.search_read([('order_id', 'in', list(order_refs)), ('state', '=', 'draft')],
+                                       ['order_id', 'order_status'])
+        return {(line['order_id'], line['order_status']) for line in queue_lines}
@@ -324,54 +324,55 @@ class StockAdjustmentReportHistory(models.Model):
         group_wise_lines_list = {}
         reason_codes = amazon_adjustment_reason_code_obj.search([('group_id', '!=', False)])
         stock_config = amazon_stock_adjustment_config_obj.search([('seller_id', '=', self.seller_id.id)])
-        for row in reader:
-            if sync_fulfillment and not row.get('fulfillment-center-id', False) in fc_available:
-                self.env['amazon.seller.ept'].with_context(
-                    {'for_stock_adjustment': True}).request_fba_fulfilment_centers(self.seller_id.ids)
-                sync_fulfillment = False
-            if row.get('Event Type') != 'Adjustments':
-                continue
-            reason = row.get('Reason', '')
-            if not reason:
-                continue
-            code = reason_codes.filtered(lambda l, reason=reason: l.name == reason)
-            if not code:
-                partially_processed = True
-                message = 'Code %s configuration not found for processing' % (reason)
-                common_log_line_obj.create_common_log_line_ept(
-                    message=message, model_name=AMAZON_STOCK_ADJUSTMENT_REPORT_HISTORY, mismatch_details=True,
-                    module='amazon_ept', operation_type='import', res_id=self.id,
-                    amz_seller_ept=self.seller_id and self.seller_id.id or False)
-                continue
-            if len(code.ids) > 1:
-                partially_processed = True
-                message = 'Multiple Code %s configuration found for processing' % (reason)
-                common_log_line_obj.create_common_log_line_ept(
-                    message=message, model_name=AMAZON_STOCK_ADJUSTMENT_REPORT_HISTORY, mismatch_details=True,
-                    module='amazon_ept', operation_type='import', res_id=self.id,
-                    amz_seller_ept=self.seller_id and self.seller_id.id or False)
-                continue
-            config = stock_config.filtered(lambda l, code=code: l.group_id.id == code.group_id.id)
-            if not config:
-                partially_processed = True
-                message = 'Seller wise code %s configuration not found for processing' % (code.name)
-                common_log_line_obj.create_common_log_line_ept(
-                    message=message, model_name=AMAZON_STOCK_ADJUSTMENT_REPORT_HISTORY, mismatch_details=True,
-                    module='amazon_ept', operation_type='import', res_id=self.id,
-                    amz_seller_ept=self.seller_id and self.seller_id.id or False)
-                continue
-            if not config.is_send_email and not config.location_id and not config.group_id.id == self.env.ref(
-                    'amazon_ept.amazon_damaged_inventory_ept').id:
-                partially_processed = True
-                if not config.location_id:
-                    message = 'Location not configured for stock adjustment config ERP Id %s || group name %s' % (
-                        config.id, config.group_id.name)
-                    common_log_line_obj.create_common_log_line_ept(
+        with common_log_line_obj.common_log_line_buffer_ept() as log_buffer:
+            for row in reader:
+                if sync_fulfillment and not row.get('fulfillment-center-id', False) in fc_available:
+                    self.env['amazon.seller.ept'].with_context(
+                        {'for_stock_adjustment': True}).request_fba_fulfilment_centers(self.seller_id.ids)
+                    sync_fulfillment = False
+                if row.get('Event Type') != 'Adjustments':
+                    continue
+                reason = row.get('Reason', '')
+                if not reason:
+                    continue
+                code = reason_codes.filtered(lambda l, reason=reason: l.name == reason)
+                if not code:
+                    partially_processed = True
+                    message = 'Code %s configuration not found for processing' % (reason)
+                    log_buffer.add(
                         message=message, model_name=AMAZON_STOCK_ADJUSTMENT_REPORT_HISTORY, mismatch_details=True,
                         module='amazon_ept', operation_type='import', res_id=self.id,
                         amz_seller_ept=self.seller_id and self.seller_id.id or False)
-                continue
-            group_wise_lines_list = self.get_amazon_group_wise_lines_list(row, config, group_wise_lines_list)
+                    continue
+                if len(code.ids) > 1:
+                    partially_processed = True
+                    message = 'Multiple Code %s configuration found for processing' % (reason)
+                    log_buffer.add(
+                        message=message, model_name=AMAZON_STOCK_ADJUSTMENT_REPORT_HISTORY, mismatch_details=True,
+                        module='amazon_ept', operation_type='import', res_id=self.id,
+                        amz_seller_ept=self.seller_id and self.seller_id.id or False)
+                    continue
+                config = stock_config.filtered(lambda l, code=code: l.group_id.id == code.group_id.id)
+                if not config:
+                    partially_processed = True
+                    message = 'Seller wise code %s configuration not found for processing' % (code.name)
+                    log_buffer.add(
+                        message=message, model_name=AMAZON_STOCK_ADJUSTMENT_REPORT_HISTORY, mismatch_details=True,
+                        module='amazon_ept', operation_type='import', res_id=self.id,
+                        amz_seller_ept=self.seller_id and self.seller_id.id or False)
+                    continue
+                if not config.is_send_email and not config.location_id and not config.group_id.id == self.env.ref(
+                        'amazon_ept.amazon_damaged_inventory_ept').id:
+                    partially_processed = True
+                    if not config.location_id:
+                        message = 'Location not configured for stock adjustment config ERP Id %s || group name %s' % (
+                            config.id, config.group_id.name)
+                        log_buffer.add(
+                            message=message, model_name=AMAZON_STOCK_ADJUSTMENT_REPORT_HISTORY, mismatch_details=True,
+                            module='amazon_ept', operation_type='import', res_id=self.id,
+                            amz_seller_ept=self.seller_id and self.seller_id.id or False)
+                    continue
+                group_wise_lines_list = self.get_amazon_group_wise_lines_list(row, config, group_wise_lines_list)
         return group_wise_lines_list, partially_processed
 
     def _process_group_wise_lines(self, group_of_data, partially_processed):
@@ -801,8 +801,9 @@ class AmazonProcessImportExport(models.TransientModel):
         seller_stock_instance = self.get_amz_export_price_and_stock_details(instance_ids)
         if seller_stock_instance:
             for seller, instance_ids in seller_stock_instance.items():
+                stock_qty_cache = {}
                 for instance in instance_ids:
-                    instance.export_stock_levels()
+                    instance.with_context(stock_qty_cache_ept=stock_qty_cache).export_stock_levels()
 
     def amz_export_price_from_odoo_to_amazon(self):
         """
@@ -116,6 +116,7 @@ class AmazonConfigSettings(models.TransientModel):
     amz_sales_journal_id = fields.Many2one('account.journal', string='Sales Journal',
                                            domain=[('type', '=', 'sale')])
     amz_fulfillment_latency = fields.Integer('Fulfillment Latency', default=3)
+    amz_fbm_queue_line_limit = fields.Integer("FBM Order Queue Size", default=100)
     amz_outbound_instance_id = fields.Many2one(AMAZON_INSTANCE_EPT,
                                                string='Default Outbound Marketplace',
                                                help="Select Amazon Instance for Outbound Orders.")
@@ -325,6 +326,7 @@ class AmazonConfigSettings(models.TransientModel):
                 seller.sale_journal_id else False
             vals['value'][
                 'amz_fulfillment_latency'] = seller.fulfillment_latency or 0
+            vals['value']['amz_fbm_queue_line_limit'] = seller.fbm_queue_line_limit or 100
             vals['value']['invoice_upload_policy'] = seller.invoice_upload_policy
             vals['value']['amz_upload_refund_invoice'] = seller.amz_upload_refund_invoice
             vals['value']['amz_invoice_report'] = seller.amz_invoice_report.id or False
@@ -560,6 +562,7 @@ class AmazonConfigSettings(models.TransientModel):
                 'sale_journal_id'] = self.amz_sales_journal_id.id if \
                 self.amz_sales_journal_id else False
             vals['fulfillment_latency'] = self.amz_fulfillment_latency or 0
+            vals['fbm_queue_line_limit'] = self.amz_fbm_queue_line_limit or 100
             vals['invoice_upload_policy'] = self.invoice_upload_policy
             vals['amz_upload_refund_invoice'] = self.amz_upload_refund_invoice
             vals['amz_invoice_report'] = self.amz_invoice_report.id or False
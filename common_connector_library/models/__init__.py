@@ -23,3 +23,4 @@ from . import queue_line_dashboard
 from . import digest
 from . import delivery_carrier
 from . import sale_order_line
+from . import ir_module_module
@@ -8,6 +8,7 @@ class CommonLogBookEpt(models.Model):
     _inherit = ["mail.thread", "mail.activity.mixin"]
     _order = 'id desc'
     _description = "Common log book Ept"
+    _queue_cleanup_ept = True
 
     name = fields.Char(readonly=True)
     type = fields.Selection([('import', 'Import'), ('export', 'Export')], string="Operation")
@@ -32,13 +33,14 @@ class CommonLogBookEpt(models.Model):
     @api.model_create_multi
     def create(self, vals_list):
         """
-        Inherited this method for generate a sequence for a common logbook.
+        Inherited this method for generate a sequence for a common logbook. Callers creating many log
+        books can skip mail tracking and followers with MAIL_LESS_CONTEXT in the context.
         :param: vals_list: list of dict{}
         :return: common.log.book.ept()
         """
+        sequence_obj = self.env['ir.sequence']
         for vals in vals_list:
-            seq = self.env['ir.sequence'].next_by_code('common.log.book.ept') or '/'
-            vals['name'] = seq
+            vals['name'] = sequence_obj.next_by_code('common.log.book.ept') or '/'
         return super(CommonLogBookEpt, self).create(vals_list)
 
     def create_common_log_book_ept(self, **kwargs):
@@ -63,5 +65,4 @@ class CommonLogBookEpt(models.Model):
         :param: model_name: model name - str
         :return: ir.model()
         """
-        model_id = self.env['ir.model']
-        return model_id.sudo().search([('model', '=', model_name)])
+        return self.env['ir.model']._get(model_name)
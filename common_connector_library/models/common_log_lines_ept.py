@@ -1,12 +1,70 @@
 # -*- coding: utf-8 -*-
 # See LICENSE file for full copyright and licensing details.
-from odoo import models, fields
+from odoo import models, fields, api
+
+LOG_LINE_FLUSH_SIZE = 1000
+MAIL_LESS_CONTEXT = {'tracking_disable': True, 'mail_create_nolog': True, 'mail_create_nosubscribe': True}
+PRECOMMIT_BUFFERS_KEY = 'common_log_line_buffers_ept'
+
+
+class CommonLogLineBufferEpt:
+    """
+    Collect log line values in memory and insert them with one multi-row create. The buffer is
+    flushed when it reaches the flush size, when the context manager exits without error and before
+    every commit of the cursor, so lines are never lost at the commit points of long running imports.
+    """
+
+    def __init__(self, log_line_obj, flush_size=LOG_LINE_FLUSH_SIZE):
+        self.log_line_obj = log_line_obj
+        self.flush_size = flush_size
+        self.vals_list = []
+        self.model_ids = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # On error the pending lines are left to the precommit flush registered by add(): they are
+        # inserted if the caller handles the error and commits, and discarded with a rollback.
+        if exc_type is None:
+            self.flush()
+
+    def add(self, **kwargs):
+        """
+        Define this method for add log line values in buffer, it accepts the same keyword
+        arguments as create_common_log_line_ept().
+        :param: kwargs: dict {}
+        :return: True
+        """
+        self.vals_list.append(self.log_line_obj._prepare_common_log_line_vals_ept(self.model_ids, **kwargs))
+        # The precommit data is cleared with its callbacks at every commit and rollback, so the flush is
+        # registered once per transaction.
+        registered_buffers = self.log_line_obj.env.cr.precommit.data.setdefault(PRECOMMIT_BUFFERS_KEY, set())
+        if id(self) not in registered_buffers:
+            self.log_line_obj.env.cr.precommit.add(self.flush)
+            registered_buffers.add(id(self))
+        if len(self.vals_list) >= self.flush_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """
+        Define this method for insert all buffered log lines.
+        :return: common.log.lines.ept()
+        """
+        vals_list, self.vals_list = self.vals_list, []
+        if not vals_list:
+            return self.log_line_obj.browse()
+        log_lines = self.log_line_obj.create(vals_list)
+        log_lines.flush_recordset()
+        return log_lines
 
 
 class CommonLogLineEpt(models.Model):
     _name = "common.log.lines.ept"
     _inherit = ["mail.thread", "mail.activity.mixin"]
     _description = "Common log line"
+    _queue_cleanup_ept = True
 
     product_id = fields.Many2one('product.product', 'Product')
     order_ref = fields.Char('Order Reference')
@@ -30,6 +88,20 @@ class CommonLogLineEpt(models.Model):
                                ('tpw_ept', '3PL Connector'),
                                ('walmart_ept', 'Walmart Connector')])
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """
+        Inherited this method for create log lines without mail tracking and followers when nobody
+        follows their log books, the mail.thread overhead is skipped unless the caller asks for it.
+        :param: vals_list: list of dict{}
+        :return: common.log.lines.ept()
+        """
+        log_book_ids = {vals['log_book_id'] for vals in vals_list if vals.get('log_book_id')}
+        if self.env['common.log.book.ept'].sudo().browse(log_book_ids).message_follower_ids:
+            return super(CommonLogLineEpt, self).create(vals_list)
+        context = dict(MAIL_LESS_CONTEXT, **self._context)
+        return super(CommonLogLineEpt, self.with_context(context)).create(vals_list)
+
     def create_common_log_line_ept(self, **kwargs):
         """
         Define this method for create common.log.lines.ept() model record as
@@ -37,14 +109,34 @@ class CommonLogLineEpt(models.Model):
         :param: kwargs: dict {}
         :return: common.log.lines.ept()
         """
-        values = {}
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                values.update({key: value})
-        if kwargs.get('model_name'):
-            model = self._get_model_id(kwargs.get('model_name'))
-            values.update({'model_id': model.id})
-        return self.create(values)
+        return self.create(self._prepare_common_log_line_vals_ept({}, **kwargs))
+
+    def common_log_line_buffer_ept(self, flush_size=LOG_LINE_FLUSH_SIZE):
+        """
+        Define this method for get a buffered log line writer, use it as context manager while
+        creating many log lines in a loop.
+        Usage: with log_line_obj.common_log_line_buffer_ept() as log_buffer:
+                   log_buffer.add(message=message, model_name=model_name, res_id=res_id)
+        :param: flush_size: number of log lines inserted at once
+        :return: CommonLogLineBufferEpt
+        """
+        return CommonLogLineBufferEpt(self, flush_size)
+
+    def _prepare_common_log_line_vals_ept(self, model_ids, **kwargs):
+        """
+        Define this method for prepare common.log.lines.ept() values as per given keyword
+        arguments.
+        :param: model_ids: dict {model name: ir.model() id} used as cache
+        :param: kwargs: dict {}
+        :return: dict {}
+        """
+        values = {key: value for key, value in kwargs.items() if key in self._fields}
+        model_name = kwargs.get('model_name')
+        if model_name:
+            if model_name not in model_ids:
+                model_ids[model_name] = self._get_model_id(model_name).id
+            values.update({'model_id': model_ids[model_name]})
+        return values
 
     def _get_model_id(self, model_name):
         """
@@ -53,5 +145,4 @@ class CommonLogLineEpt(models.Model):
         :param: model_name: model name - str
         :return: ir.model()
         """
-        ir_model_obj = self.env['ir.model']
-        return ir_model_obj.sudo().search([('model', '=', model_name)])
+        return self.env['ir.model']._get(model_name)
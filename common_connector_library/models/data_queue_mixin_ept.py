@@ -1,105 +1,104 @@
 # -*- coding: utf-8 -*-
 # See LICENSE file for full copyright and licensing details.
-import itertools
-from odoo import models
+from datetime import timedelta
+from odoo import models, fields
 from psycopg2 import sql
 
-ALL_QUEUE_TABLES = [
-    # All connector Queues
-  'woo_coupon_data_queue_ept', 'woo_customer_data_queue_ept','woo_export_stock_queue_ept','woo_order_data_queue_ept','woo_product_data_queue_ept',
-  'shopify_customer_data_queue_ept', 'shopify_export_stock_queue_ept', 'shopify_order_data_queue_ept', 'shopify_product_data_queue_ept',
-  'ebay_import_product_queue', 'ebay_order_data_queue_ept',
-  'walmart_order_queue_ept',
-  'bol_queue_ept', 'bol_shipped_data_queue_ept',
-  'magento_export_stock_queue_ept', 'magento_customer_data_queue_ept', 'magento_order_data_queue_ept', 'sync_import_magento_product_queue', 'woo_coupon_data_queue_line_ept',
+DEFAULT_QUEUE_RETENTION_DAYS = 7
+QUEUE_CLEANUP_CHUNK_SIZE = 5000
+QUEUE_RETENTION_PARAMETER = 'common_connector_library.queue_retention_days.%s'
 
-  # All connector queuelines
-  'woo_customer_data_queue_line_ept', 'woo_export_stock_queue_line_ept', 'woo_order_data_queue_line_ept', 'woo_product_data_queue_line_ept',
-  'ebay_order_data_queue_line_ept', 'ebay_import_product_queue_line',
-  'walmart_order_queue_line_ept',
-  'shopify_customer_data_queue_line_ept', 'shopify_export_stock_queue_line_ept', 'shopify_order_data_queue_line_ept', 'shopify_product_data_queue_line_ept',
-  'bol_order_data_queue_line_ept', 'bol_shipped_data_queue_line_ept',
-  'magento_customer_data_queue_line_ept', 'magento_export_stock_queue_line_ept', 'magento_order_data_queue_line_ept', 'sync_import_magento_product_queue_line',
-  'common_log_book_ept', 'common_log_lines_ept'
-]
 
 class DataQueueMixinEpt(models.AbstractModel):
+    """
+    Delete old connector queues and log books. Only queue models which opt in by setting the class
+    attribute _queue_cleanup_ept = True are ever cleaned, they may set _queue_retention_days_ept and the
+    retention can be changed per model with the system parameter
+    common_connector_library.queue_retention_days.<model name>.
+    """
     _name = 'data.queue.mixin.ept'
     _description = 'Data Queue Mixin'
 
-    def delete_data_queue_ept(self, queue_detail=[], is_delete_queue=False):
+    def delete_data_queue_ept(self, queue_detail=None, is_delete_queue=False):
         """
-        Define this method for delete unused data of queues and log book. logbook deletes
-        which created before 7 days ago.
-        :param: queue_detail: list of queue records, like product, order queue [['product_queue', 'order_queue']]
-        :param: is_delete_queue: True/False
+        Define this method for delete unused data of queues and log book. Records are deleted which
+        are created before the retention days of their queue model, 7 days by default.
+        :param: queue_detail: list of queue table names, like product, order queue [['product_queue', 'order_queue']]
+        :param: is_delete_queue: True/False, delete all records of the queues
         :return: True
         """
-        if queue_detail:
-            try:
-                queue_detail += ['common_log_book_ept','common_log_lines_ept']
-                queue_detail = list(set(queue_detail))
-                for tbl_name in queue_detail:
-                    if tbl_name not in ALL_QUEUE_TABLES:
-                        return True
-                    self.delete_data_queue_schedule_activity_ept(tbl_name, is_delete_queue)
-                    if is_delete_queue:
-                        query = sql.SQL("delete from {}").format(sql.Identifier(tbl_name))
-                        self._cr.execute(query)
-                        continue
-                    query = sql.SQL("delete FROM {} where cast(create_date as Date) <= current_date - %s").format(
-                        sql.Identifier(tbl_name))
-                    params = (7,)
-                    self._cr.execute(query, params)
-            except Exception as error:
-                return error
+        try:
+            for model_name in self._get_cleanup_queue_models_ept(queue_detail or []):
+                self._delete_queue_records_ept(model_name, is_delete_queue)
+        except Exception as error:
+            return error
         return True
 
-    def delete_data_queue_schedule_activity_ept(self, tbl_name, is_delete_queue=False):
+    def _get_cleanup_queue_models_ept(self, table_names):
         """
-        Define this method for delete schedule activity for the deleted data queues or
-        log book records.
-        :param tbl_name: deleted table name
-        :param is_delete_queue: True or False
-        :return: Boolean (TRUE/FALSE)
+        Define this method for find the queue models to clean up from the registry. Only models which
+        declare _queue_cleanup_ept are returned, when table names are given they are restricted to those
+        tables and the log book tables, other table names are ignored.
+        :param: table_names: list of table names
+        :return: list of model names
         """
-        log_book_obj = self.env['common.log.book.ept']
-        model_name = tbl_name.replace('_', '.')
-        model = log_book_obj._get_model_id(model_name)
-        if tbl_name not in ALL_QUEUE_TABLES:
-            return True
-        if is_delete_queue:
-            query = """delete from mail_activity where res_model_id=%s"""
-            self._cr.execute(query, model.id)
-            query = """DELETE FROM mail_message WHERE model = %s"""
-            self._cr.execute(query, model_name)
-            query = """DELETE FROM mail_followers WHERE res_model = %s"""
-            self._cr.execute(query, model_name)
-        else:
-            query = sql.SQL("select id from {} where cast(create_date as Date) <= current_date - %s").format(
-                sql.Identifier(tbl_name))
-            params = (7,)
-            results = self._cr.execute(query, params)
-            results = self._cr.fetchall()
-            records = tuple(set(list(itertools.chain(*results))))
-            if records:
-                if len(records) == 1:
-                    query1 = """delete from mail_activity where res_id=%s and res_model_id=%s"""
-                    params1 = (records[0], model.id)
-                    query = """delete from mail_message where res_id=%s and model = %s"""
-                    params = (records[0], model_name)
-                    self._cr.execute(query, params)
-                    query = """delete from mail_followers where res_id=%s and res_model = %s"""
-                    params = (records[0], model_name)
-                    self._cr.execute(query, params)
-                else:
-                    query1 = """delete from mail_activity where res_id in %s and res_model_id=%s"""
-                    params1 = (records, model.id)
-                    query = """delete from mail_message where res_id in %s and model = %s"""
-                    params = (records, model_name)
-                    self._cr.execute(query, params)
-                    query = """delete from mail_followers where res_id in %s and res_model = %s"""
-                    params = (records, model_name)
-                    self._cr.execute(query, params)
-                self._cr.execute(query1, params1)
-        return True
+        table_names = set(table_names)
+        if table_names:
+            table_names |= {'common_log_book_ept', 'common_log_lines_ept'}
+        return [model_name for model_name, model in self.env.registry.items()
+                if not model._abstract and model._auto and getattr(model, '_queue_cleanup_ept', False) and
+                (not table_names or model._table in table_names)]
+
+    def _get_queue_retention_days_ept(self, model_name):
+        """
+        Define this method for get retention days of the queue model.
+        :param: model_name: model name - str
+        :return: int
+        """
+        retention_days = getattr(self.env.registry[model_name], '_queue_retention_days_ept',
+                                 DEFAULT_QUEUE_RETENTION_DAYS)
+        parameter = self.env['ir.config_parameter'].sudo().get_param(QUEUE_RETENTION_PARAMETER % model_name)
+        try:
+            retention_days = int(parameter) if parameter else retention_days
+        except ValueError:
+            pass
+        return max(retention_days, 1)
+
+    def _delete_queue_records_ept(self, model_name, is_delete_queue=False):
+        """
+        Define this method for delete the queue records in chunks of QUEUE_CLEANUP_CHUNK_SIZE. Every chunk
+        is selected by primary key order with a plain create_date range and its activities, messages and
+        followers are deleted in the same statement with joins on the selected ids.
+        :param: model_name: model name - str
+        :param: is_delete_queue: True/False, delete all records of the queue
+        :return: number of deleted records
+        """
+        model = self.env[model_name]
+        params = {'limit': QUEUE_CLEANUP_CHUNK_SIZE, 'model': model_name,
+                  'model_id': self.env['ir.model']._get(model_name).id}
+        where = sql.SQL("")
+        if not is_delete_queue:
+            # Same boundary as cast(create_date as Date) <= current_date - retention days
+            params['cutoff'] = fields.Date.today() - timedelta(days=self._get_queue_retention_days_ept(model_name) - 1)
+            where = sql.SQL("WHERE create_date < %(cutoff)s")
+        ctes = [sql.SQL("doomed AS (SELECT id FROM {} {} ORDER BY id LIMIT %(limit)s)").format(
+            sql.Identifier(model._table), where)]
+        if 'activity_ids' in model._fields:
+            ctes.append(sql.SQL("""del_activity AS (DELETE FROM mail_activity activity USING doomed
+                WHERE activity.res_model_id = %(model_id)s AND activity.res_id = doomed.id)"""))
+        if 'message_ids' in model._fields:
+            ctes.append(sql.SQL("""del_message AS (DELETE FROM mail_message message USING doomed
+                WHERE message.model = %(model)s AND message.res_id = doomed.id)"""))
+            ctes.append(sql.SQL("""del_follower AS (DELETE FROM mail_followers follower USING doomed
+                WHERE follower.res_model = %(model)s AND follower.res_id = doomed.id)"""))
+        query = sql.SQL("WITH {} DELETE FROM {} queue USING doomed WHERE queue.id = doomed.id").format(
+            sql.SQL(", ").join(ctes), sql.Identifier(model._table))
+        total_deleted = 0
+        while True:
+            self._cr.execute(query, params)
+            deleted = self._cr.rowcount
+            total_deleted += deleted
+            if deleted < QUEUE_CLEANUP_CHUNK_SIZE:
+                break
+        model.invalidate_model()
+        return total_deleted
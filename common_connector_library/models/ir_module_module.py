@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from odoo import models, tools
+from odoo.tools import frozendict
+
+CONNECTOR_MODULES = ['shopify_ept', 'woo_commerce_ept', 'amazon_ept', 'walmart_ept', 'ebay_ept', 'bol_ept']
+
+
+class IrModuleModule(models.Model):
+    _inherit = 'ir.module.module'
+
+    def _get_installed_module_ids_ept(self):
+        """
+        Define this method for get the installed modules with one query. Installing or uninstalling a
+        module loads a new registry, so the result is cached in the registry once it is ready and read
+        from the database while modules are loading.
+        :return: frozendict {module name: ir.module.module() id}
+        """
+        if not self.pool.ready:
+            return self._read_installed_module_ids_ept()
+        return self._get_cached_installed_module_ids_ept()
+
+    @tools.ormcache()
+    def _get_cached_installed_module_ids_ept(self):
+        """
+        Define this method for cache the installed modules in the registry.
+        :return: frozendict {module name: ir.module.module() id}
+        """
+        return self._read_installed_module_ids_ept()
+
+    def _read_installed_module_ids_ept(self):
+        """
+        Define this method for read the installed modules from the database.
+        :return: frozendict {module name: ir.module.module() id}
+        """
+        self._cr.execute("SELECT name, id FROM ir_module_module WHERE state = 'installed'")
+        return frozendict(self._cr.fetchall())
+
+    def _get_installed_connector_modules_ept(self):
+        """
+        Define this method for get the installed connector modules from the registry cache.
+        :return: list of module names
+        """
+        installed_modules = self._get_installed_module_ids_ept()
+        return [module for module in CONNECTOR_MODULES if module in installed_modules]
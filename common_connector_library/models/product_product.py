@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 # See LICENSE file for full copyright and licensing details.
+import warnings
 from datetime import datetime
 from odoo.exceptions import UserError
 from odoo import models, fields, api, _
 
-module_list = ['shopify_ept', 'woo_commerce_ept', 'amazon_ept', 'walmart_ept', 'ebay_ept', 'bol_ept']
+STOCK_QTY_FIELDS = ('qty_available', 'free_qty', 'virtual_available')
+# Kits keep the forecast of the ORM: free quantity plus incoming minus outgoing moves of the components.
+KIT_QTY_FIELDS = ('qty_available', 'free_qty', 'incoming_qty', 'outgoing_qty')
+OPEN_MOVE_STATES = ('waiting', 'confirmed', 'partially_available', 'assigned')
 
 
 class ProductProduct(models.Model):
@@ -46,41 +50,31 @@ class ProductProduct(models.Model):
     @api.model_create_multi
     def create(self, vals_list):
         """
-        Inherited this method for adding the main image in common images.
+        Inherited this method for adding the main image in common images when a connector is installed.
         :param: list of dict {}
         :return: product.product()
         """
-        installed_module = False
         res = super(ProductProduct, self).create(vals_list)
-        for key in module_list:
-            if self.search_installed_module_ept(key):
-                if not installed_module:
-                    installed_module = True
-                    for vals in vals_list:
-                        if vals.get("image_1920", False) and res:
-                            image_vals = res.prepare_common_image_vals(vals)
-                            self.env["common.product.image.ept"].create(image_vals)
+        if res and self.env['ir.module.module']._get_installed_connector_modules_ept():
+            for vals in vals_list:
+                if vals.get("image_1920", False):
+                    image_vals = res.prepare_common_image_vals(vals)
+                    self.env["common.product.image.ept"].create(image_vals)
         return res
 
     def write(self, vals):
         """
-        Inherited this method for adding the main image in common images.
+        Inherited this method for adding the main image in common images when a connector is installed.
         :param: dict {}
         :return: True/False
         """
-        installed_module = False
         res = super(ProductProduct, self).write(vals)
-        for key in module_list:
-            if self.search_installed_module_ept(key):
-                if not installed_module:
-                    installed_module = True
-                    if vals.get("image_1920", False) and self:
-                        common_product_image_obj = self.env["common.product.image.ept"]
-                        for record in self:
-                            if vals.get("image_1920"):
-                                image_vals = record.prepare_common_image_vals(vals)
-                                common_product_image_obj.create(image_vals)
-
+        if vals.get("image_1920", False) and self and \
+                self.env['ir.module.module']._get_installed_connector_modules_ept():
+            common_product_image_obj = self.env["common.product.image.ept"]
+            for record in self:
+                image_vals = record.prepare_common_image_vals(vals)
+                common_product_image_obj.create(image_vals)
         return res
 
     def get_products_based_on_movement_date_ept(self, from_datetime, company):
@@ -110,13 +104,12 @@ class ProductProduct(models.Model):
     def search_installed_module_ept(self, module_name):
         """
         Define this method for check the module is install or not based
-        on given module name.
+        on given module name, installed modules are read from the registry cache.
         :param: module_name: str
         :return: ir.module.module()
         """
-        module_obj = self.env['ir.module.module']
-        module = module_obj.sudo().search([('name', '=', module_name), ('state', '=', 'installed')])
-        return module
+        module_obj = self.env['ir.module.module'].sudo()
+        return module_obj.browse(module_obj._get_installed_module_ids_ept().get(module_name, []))
 
     def get_product_movement_of_bom_product(self, date, company):
         """
@@ -149,32 +142,16 @@ class ProductProduct(models.Model):
         product_ids = tuple(product_list)
         return location_ids, product_ids
 
-    def check_for_bom_products(self, product_ids):
-        """
-        This method checks if any product is BoM, then get stock for them.
-        :param product_ids: Ids of Product.
-        :return: Ids of BoM products.
-        """
-        bom_product_ids = []
-        mrp_module = self.search_installed_module_ept('mrp')
-        if mrp_module:
-            qry = """select p.id as product_id from product_product as p
-                    inner join mrp_bom as mb on mb.product_tmpl_id=p.product_tmpl_id
-                    and p.id in %s"""
-            params = (product_ids,)
-            self._cr.execute(qry, params)
-            bom_product_ids = self._cr.dictfetchall()
-            bom_product_ids = [product_id.get('product_id') for product_id in bom_product_ids]
-
-        return bom_product_ids
-
     def prepare_free_qty_query(self, location_ids, simple_product_list_ids):
         """
         This method prepares query for fetching the free qty.
+        Deprecated, the quantities are computed by _get_simple_stock_quantities_ept.
         :param location_ids:Ids of Locations.
         :param simple_product_list_ids: Ids of products which are not BoM.
         :return: Prepared query in string.
         """
+        warnings.warn("prepare_free_qty_query is deprecated, override _get_simple_stock_quantities_ept instead",
+                      DeprecationWarning, stacklevel=2)
         query = """select pp.id as product_id,
                     COALESCE(sum(sq.quantity)-sum(sq.reserved_quantity),0) as stock
                     from product_product pp
@@ -185,10 +162,13 @@ class ProductProduct(models.Model):
     def prepare_onhand_qty_query(self, location_ids, simple_product_list_ids):
         """
         This method prepares query for fetching the On hand qty.
+        Deprecated, the quantities are computed by _get_simple_stock_quantities_ept.
         :param location_ids:Ids of Locations.
         :param simple_product_list_ids: Ids of products which are not BoM.
         :return: prepared query
         """
+        warnings.warn("prepare_onhand_qty_query is deprecated, override _get_simple_stock_quantities_ept instead",
+                      DeprecationWarning, stacklevel=2)
         query = """select pp.id as product_id,
                         COALESCE(sum(sq.quantity),0) as stock
                         from product_product pp
@@ -199,10 +179,13 @@ class ProductProduct(models.Model):
     def prepare_forecasted_qty_query(self, location_ids, simple_product_list_ids):
         """
         This method prepares query for fetching the forecasted qty.
+        Deprecated, the quantities are computed by _get_simple_stock_quantities_ept.
         :param location_ids:Ids of Locations.
         :param simple_product_list_ids: Ids of products which are not BoM.
         :return: Prepared query in string.
         """
+        warnings.warn("prepare_forecasted_qty_query is deprecated, override _get_simple_stock_quantities_ept "
+                      "instead", DeprecationWarning, stacklevel=2)
         query = """select product_id,sum(stock) as stock from (select pp.id as product_id,
                         COALESCE(sum(sq.quantity)-sum(sq.reserved_quantity),0) as stock
                         from product_product pp
@@ -214,58 +197,153 @@ class ProductProduct(models.Model):
                         group by product_id) as test group by test.product_id"""
         return query
 
-    def get_free_qty_ept(self, warehouse, product_list):
+    def get_stock_quantities_ept(self, warehouse, product_list):
         """
-        This method is used to get free to use quantity based on warehouse and products.
+        This method computes on hand, free and forecasted quantity of products in the stock locations of
+        warehouses with a constant number of queries. Kit products are exploded in memory from their
+        prefetched BoM lines. When the context holds a dict in stock_qty_cache_ept, quantities are kept in
+        it and reused for the rest of the export run.
         :param: warehouse: stock.warehouse()
         :param: product_list: list of product.product() ids
-        :return: on-hand qty
+        :return: dict {product id: {'qty_available': qty, 'free_qty': qty, 'virtual_available': qty,
+                                    'incoming_qty': qty, 'outgoing_qty': qty}}
         """
-        qty_on_hand = {}
         location_ids, product_ids = self.prepare_location_and_product_ids(warehouse, product_list)
+        stock_cache = self._context.get('stock_qty_cache_ept')
+        quantities = stock_cache.setdefault(location_ids, {}) if isinstance(stock_cache, dict) else {}
+        missing_product_ids = [product_id for product_id in set(product_ids) if product_id not in quantities]
+        if missing_product_ids:
+            quantities.update(self._compute_stock_quantities_ept(location_ids, missing_product_ids))
+        return {product_id: quantities[product_id] for product_id in product_ids}
+
+    def _compute_stock_quantities_ept(self, location_ids, product_ids):
+        """
+        This method computes stock quantities of products, components of kit products are fetched with
+        the same query as simple products.
+        :param location_ids: Ids of Locations.
+        :param product_ids: Ids of Products.
+        :return: dict {product id: {'qty_available': qty, 'free_qty': qty, 'virtual_available': qty,
+                                    'incoming_qty': qty, 'outgoing_qty': qty}}
+        """
+        kit_boms = self._get_kit_boms_ept(product_ids)
+        simple_product_ids = set(product_ids) - set(kit_boms)
+        for bom in kit_boms.values():
+            simple_product_ids |= set(bom.bom_line_ids.product_id.ids) - set(kit_boms)
+        quantities = self._get_simple_stock_quantities_ept(location_ids, tuple(simple_product_ids))
+        for product_id in product_ids:
+            if product_id in kit_boms:
+                self._get_kit_stock_quantities_ept(product_id, kit_boms, quantities)
+        return {product_id: quantities[product_id] for product_id in product_ids}
+
+    def _get_simple_stock_quantities_ept(self, location_ids, product_ids):
+        """
+        This method fetches on hand, free and forecasted quantity of non kit products with one query.
+        Forecasted quantity is the free quantity plus the reserved moves coming in the locations, the
+        incoming and outgoing quantity of the open moves are fetched for the forecast of kits.
+        :param location_ids: Ids of Locations.
+        :param product_ids: Ids of Products which are not kits.
+        :return: dict {product id: {'qty_available': qty, 'free_qty': qty, 'virtual_available': qty,
+                                    'incoming_qty': qty, 'outgoing_qty': qty}}
+        """
+        quantities = {product_id: dict.fromkeys(STOCK_QTY_FIELDS + KIT_QTY_FIELDS, 0.0) for product_id in product_ids}
+        if not location_ids or not product_ids:
+            return quantities
+        query = """select pp.id as product_id, COALESCE(sq.quantity, 0) as quantity,
+                    COALESCE(sq.reserved_quantity, 0) as reserved_quantity,
+                    COALESCE(sm.assigned_qty, 0) as assigned_qty, COALESCE(sm.incoming_qty, 0) as incoming_qty,
+                    COALESCE(sm.outgoing_qty, 0) as outgoing_qty
+                    from product_product pp
+                    left join (select product_id, sum(quantity) as quantity, sum(reserved_quantity) as reserved_quantity
+                               from stock_quant where location_id in %(locations)s and product_id in %(products)s
+                               group by product_id) sq on sq.product_id = pp.id
+                    left join (select product_id,
+                                      sum(product_qty) filter (where state = 'assigned'
+                                          and location_dest_id in %(locations)s) as assigned_qty,
+                                      sum(product_qty) filter (where location_dest_id in %(locations)s
+                                          and location_id not in %(locations)s) as incoming_qty,
+                                      sum(product_qty) filter (where location_id in %(locations)s
+                                          and location_dest_id not in %(locations)s) as outgoing_qty
+                               from stock_move where state in %(states)s and product_id in %(products)s
+                               and (location_id in %(locations)s or location_dest_id in %(locations)s)
+                               group by product_id) sm on sm.product_id = pp.id
+                    where pp.id in %(products)s"""
+        params = {'locations': location_ids, 'products': product_ids, 'states': OPEN_MOVE_STATES}
+        self._cr.execute(query, params)
+        for row in self._cr.dictfetchall():
+            free_qty = row.get('quantity') - row.get('reserved_quantity')
+            quantities[row.get('product_id')] = {'qty_available': row.get('quantity'), 'free_qty': free_qty,
+                                                 'virtual_available': free_qty + row.get('assigned_qty'),
+                                                 'incoming_qty': row.get('incoming_qty'),
+                                                 'outgoing_qty': row.get('outgoing_qty')}
+        return quantities
+
+    def _get_kit_boms_ept(self, product_ids):
+        """
+        This method finds kit BoMs of products and of their kit components, one search per BoM level.
+        :param product_ids: Ids of Products.
+        :return: dict {product id: mrp.bom()}
+        """
+        kit_boms = {}
+        if 'mrp.bom' not in self.env:
+            return kit_boms
+        bom_obj = self.env['mrp.bom']
+        checked_product_ids = set(product_ids)
+        products = self.browse(product_ids)
+        while products:
+            boms = bom_obj._bom_find(products, bom_type='phantom')
+            kit_boms.update({product.id: bom for product, bom in boms.items() if bom})
+            component_ids = set(bom_obj.concat(*kit_boms.values()).bom_line_ids.product_id.ids) - checked_product_ids
+            checked_product_ids |= component_ids
+            products = self.browse(list(component_ids))
+        return kit_boms
+
+    def _get_kit_stock_quantities_ept(self, product_id, kit_boms, quantities):
+        """
+        This method computes quantities of a kit product from the quantities of its components, the kit
+        quantity is the number of complete kits available from the storable components. The forecasted
+        quantity of a kit is its free quantity plus its incoming minus its outgoing quantity.
+        :param product_id: Id of kit Product.
+        :param kit_boms: dict {product id: mrp.bom()}
+        :param quantities: dict of computed quantities, updated with the kit quantities
+        :return: dict {'qty_available': qty, 'free_qty': qty, 'virtual_available': qty, 'incoming_qty': qty,
+                       'outgoing_qty': qty}
+        """
+        if product_id in quantities:
+            return quantities[product_id]
+        # Guard against recursive kits, a kit which contains itself has no stock.
+        quantities[product_id] = dict.fromkeys(STOCK_QTY_FIELDS + KIT_QTY_FIELDS, 0.0)
+        product = self.browse(product_id)
+        bom = kit_boms[product_id]
+        bom_qty = bom.product_uom_id._compute_quantity(bom.product_qty, product.uom_id, round=False) or 1.0
+        ratios = {field_name: [] for field_name in KIT_QTY_FIELDS}
+        for bom_line in bom.bom_line_ids:
+            component = bom_line.product_id
+            if bom_line._skip_bom_line(product) or (component.id not in kit_boms and not component.is_storable):
+                continue
+            qty_per_kit = bom_line.product_uom_id._compute_quantity(bom_line.product_qty / bom_qty, component.uom_id,
+                                                                    round=False, raise_if_failure=False)
+            if not qty_per_kit:
+                continue
+            if component.id in kit_boms:
+                component_qty = self._get_kit_stock_quantities_ept(component.id, kit_boms, quantities)
+            else:
+                component_qty = quantities.get(component.id, dict.fromkeys(KIT_QTY_FIELDS, 0.0))
+            for field_name in KIT_QTY_FIELDS:
+                ratios[field_name].append(component_qty[field_name] / qty_per_kit)
+        kit_qty = {field_name: min(ratio) // 1 if ratio else 0.0 for field_name, ratio in ratios.items()}
+        kit_qty['virtual_available'] = kit_qty['free_qty'] + kit_qty['incoming_qty'] - kit_qty['outgoing_qty']
+        quantities[product_id] = kit_qty
+        return quantities[product_id]
 
-        bom_product_ids = self.check_for_bom_products(product_ids)
-        if bom_product_ids:
-            # Passed location instead of the warehouse in with_context, because it was doing export the product stock
-            # of all locations of the warehouse instead of the stock location of the warehouse.
-            bom_products = self.with_context(location=[location for location in location_ids]).browse(
-                bom_product_ids)
-            for product in bom_products:
-                actual_stock = getattr(product, 'free_qty')
-                qty_on_hand.update({product.id: actual_stock})
-
-        simple_product_list = list(set(product_list) - set(bom_product_ids))
-        simple_product_list_ids = tuple(simple_product_list)
-        if simple_product_list_ids:
-            qry = self.prepare_free_qty_query(location_ids, simple_product_list_ids)
-            params = (location_ids, simple_product_list_ids)
-            self._cr.execute(qry, params)
-            result = self._cr.dictfetchall()
-            for i in result:
-                qty_on_hand.update({i.get('product_id'): i.get('stock')})
-        return qty_on_hand
-
-    # def prepare_forecasted_qty_query_for_bom_product(self, location_ids, product_ids):
-    #     """
-    #     Define this method for get forecasted stock of the give product list for the specified
-    #     location.
-    #     :param: location_ids: stock.location() ids
-    #     :param: product_ids: list of product.product()
-    #     :return: prepared query
-    #     """
-    #     query = (("""select product_id, free_qty+incoming_qty-outgoing_qty stock from (
-    #         select sq.product_id, COALESCE(sum(sq.quantity)-sum(sq.reserved_quantity),0) free_qty,
-    #         COALESCE(sum(sm_in.product_qty),0) incoming_qty,COALESCE(sum(sm_out.product_qty),0) outgoing_qty
-    #         from
-    #         stock_quant sq
-    #         left join stock_move sm_in on sm_in.product_id= sq.product_id and (sm_in.location_id in (%s) or sm_in.location_dest_id in (%s))
-    #                                       and sm_in.state in ('waiting', 'confirmed', 'assigned', 'partially_available')
-    #         left join stock_move sm_out on sm_out.product_id= sq.product_id and (sm_out.location_dest_id in (%s) or sm_out.location_id in (%s))
-    #                                       and sm_out.state in ('waiting', 'confirmed', 'assigned', 'partially_available')
-    #         where sq.product_id in (%s) and
-    #               sq.location_id in (%s) group by sq.product_id) as test;""" % (
-    #         location_ids, location_ids, location_ids, location_ids, product_ids, location_ids)))
-    #     return query
+    def get_free_qty_ept(self, warehouse, product_list):
+        """
+        This method is used to get free to use quantity based on warehouse and products.
+        :param: warehouse: stock.warehouse()
+        :param: product_list: list of product.product() ids
+        :return: free qty
+        """
+        quantities = self.get_stock_quantities_ept(warehouse, product_list)
+        return {product_id: qty.get('free_qty') for product_id, qty in quantities.items()}
 
     def get_forecasted_qty_ept(self, warehouse, product_list):
         """
@@ -274,34 +352,8 @@ class ProductProduct(models.Model):
         :param: product_list: list of product ids
         :return: forecasted qty
         """
-        forcasted_qty = {}
-        location_ids, product_ids = self.prepare_location_and_product_ids(warehouse, product_list)
-
-        bom_product_ids = self.check_for_bom_products(product_ids)
-        # bom_product_list_ids = ','.join(str(e) for e in bom_product_ids)
-        # if bom_product_list_ids:
-        #     qry = self.prepare_forecasted_qty_query_for_bom_product(location_ids, bom_product_list_ids)
-        #     self._cr.execute(qry)
-        #     actual_stock = self._cr.dictfetchall()
-        #     for i in actual_stock:
-        #         forcasted_qty.update({i.get('product_id'): i.get('stock')})
-        if bom_product_ids:
-            bom_products = self.with_context(warehouse=warehouse.ids).browse(bom_product_ids)
-            for product in bom_products:
-                actual_stock = getattr(product, 'free_qty') + getattr(product, 'incoming_qty') - getattr(product,
-                                                                                                         'outgoing_qty')
-                forcasted_qty.update({product.id: actual_stock})
-
-        simple_product_list = list(set(product_list) - set(bom_product_ids))
-        simple_product_list_ids = tuple(simple_product_list)
-        if simple_product_list_ids:
-            qry = self.prepare_forecasted_qty_query(location_ids, simple_product_list_ids)
-            params = (location_ids, simple_product_list_ids, simple_product_list_ids, location_ids)
-            self._cr.execute(qry, params)
-            result = self._cr.dictfetchall()
-            for i in result:
-                forcasted_qty.update({i.get('product_id'): i.get('stock')})
-        return forcasted_qty
+        quantities = self.get_stock_quantities_ept(warehouse, product_list)
+        return {product_id: qty.get('virtual_available') for product_id, qty in quantities.items()}
 
     def get_onhand_qty_ept(self, warehouse, product_list):
         """
@@ -310,26 +362,8 @@ class ProductProduct(models.Model):
         :param product_list:list of product_ids (Not browsable records)
         :return: On hand Quantity
         """
-        onhand_qty = {}
-        location_ids, product_ids = self.prepare_location_and_product_ids(warehouse, product_list)
-
-        bom_product_ids = self.check_for_bom_products(product_ids)
-        if bom_product_ids:
-            bom_products = self.with_context(warehouse=warehouse.ids).browse(bom_product_ids)
-            for product in bom_products:
-                actual_stock = getattr(product, 'qty_available')
-                onhand_qty.update({product.id: actual_stock})
-
-        simple_product_list = list(set(product_list) - set(bom_product_ids))
-        simple_product_list_ids = tuple(simple_product_list)
-        if simple_product_list_ids:
-            qry = self.prepare_onhand_qty_query(location_ids, simple_product_list_ids)
-            params = (location_ids, simple_product_list_ids)
-            self._cr.execute(qry, params)
-            result = self._cr.dictfetchall()
-            for i in result:
-                onhand_qty.update({i.get('product_id'): i.get('stock')})
-        return onhand_qty
+        quantities = self.get_stock_quantities_ept(warehouse, product_list)
+        return {product_id: qty.get('qty_available') for product_id, qty in quantities.items()}
 
     def _prepare_out_svl_vals(self, quantity, company,lot=False):
         """
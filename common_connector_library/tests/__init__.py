@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from . import test_data_queue_cleanup
+from . import test_stock_quantities
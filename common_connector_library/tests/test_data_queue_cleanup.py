@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from datetime import timedelta
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDataQueueCleanup(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.queue_mixin = cls.env['data.queue.mixin.ept']
+        cls.log_book_obj = cls.env['common.log.book.ept']
+        cls.old_log_book = cls.log_book_obj.create({'type': 'import', 'module': 'amazon_ept'})
+        cls.new_log_book = cls.log_book_obj.create({'type': 'import', 'module': 'amazon_ept'})
+        cls.env.cr.execute("UPDATE common_log_book_ept SET create_date = %s WHERE id = %s",
+                           (fields.Datetime.now() - timedelta(days=30), cls.old_log_book.id))
+        cls.partner = cls.env['res.partner'].create({'name': 'Queue Cleanup Partner'})
+
+    def test_only_opted_in_models(self):
+        """ Only models which declare _queue_cleanup_ept are cleaned, other table names are ignored. """
+        model_names = self.queue_mixin._get_cleanup_queue_models_ept([])
+        self.assertIn('common.log.book.ept', model_names)
+        self.assertIn('common.log.lines.ept', model_names)
+        for model_name in model_names:
+            self.assertTrue(getattr(self.env.registry[model_name], '_queue_cleanup_ept', False))
+        model_names = self.queue_mixin._get_cleanup_queue_models_ept(['res_partner', 'sale_order'])
+        self.assertNotIn('res.partner', model_names)
+        self.assertNotIn('sale.order', model_names)
+        self.assertIn('common.log.book.ept', model_names)
+
+    def test_delete_old_records(self):
+        """ Records older than the retention are deleted, recent records and other tables are kept. """
+        self.assertIs(self.queue_mixin.delete_data_queue_ept(['res_partner']), True)
+        self.assertFalse(self.old_log_book.exists())
+        self.assertTrue(self.new_log_book.exists())
+        self.assertTrue(self.partner.exists())
+
+    def test_delete_all_queue_records(self):
+        """ Deleting the whole queue never touches tables which did not opt in. """
+        self.assertIs(self.queue_mixin.delete_data_queue_ept(['res_partner'], is_delete_queue=True), True)
+        self.assertFalse(self.log_book_obj.search([('id', 'in', (self.old_log_book | self.new_log_book).ids)]))
+        self.assertTrue(self.partner.exists())
+
+    def test_retention_parameter(self):
+        """ The retention of a queue model can be changed with a system parameter. """
+        self.env['ir.config_parameter'].sudo().set_param(
+            'common_connector_library.queue_retention_days.common.log.book.ept', 60)
+        self.queue_mixin.delete_data_queue_ept()
+        self.assertTrue(self.old_log_book.exists())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestStockQuantities(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.stock_location = cls.warehouse.lot_stock_id
+        cls.customer_location = cls.env.ref('stock.stock_location_customers')
+        cls.supplier_location = cls.env.ref('stock.stock_location_suppliers')
+        product_obj = cls.env['product.product']
+        cls.component_a = product_obj.create({'name': 'Component A', 'type': 'consu', 'is_storable': True})
+        cls.component_b = product_obj.create({'name': 'Component B', 'type': 'consu', 'is_storable': True})
+        quant_obj = cls.env['stock.quant']
+        quant_obj._update_available_quantity(cls.component_a, cls.stock_location, 10)
+        quant_obj._update_available_quantity(cls.component_b, cls.stock_location, 9)
+
+    def _create_move(self, product, qty, location, location_dest):
+        move = self.env['stock.move'].create({'name': product.name, 'product_id': product.id, 'product_uom_qty': qty,
+                                              'product_uom': product.uom_id.id, 'location_id': location.id,
+                                              'location_dest_id': location_dest.id})
+        move._action_confirm()
+        return move
+
+    def test_simple_product_quantities(self):
+        """ On hand, free and forecasted quantity of storable products. """
+        self._create_move(self.component_a, 4, self.stock_location, self.customer_location)._action_assign()
+        incoming_move = self._create_move(self.component_a, 5, self.supplier_location, self.stock_location)
+        incoming_move._action_assign()
+        quantities = self.env['product.product'].get_stock_quantities_ept(self.warehouse, self.component_a.ids)
+        self.assertEqual(quantities[self.component_a.id]['qty_available'], 10)
+        self.assertEqual(quantities[self.component_a.id]['free_qty'], 6)
+        self.assertEqual(quantities[self.component_a.id]['virtual_available'], 11)
+        self.assertEqual(self.env['product.product'].get_onhand_qty_ept(self.warehouse, self.component_a.ids),
+                         {self.component_a.id: 10})
+
+    def test_kit_product_quantities(self):
+        """ Kits are computed from their components and forecast free + incoming - outgoing. """
+        if 'mrp.bom' not in self.env:
+            self.skipTest("Kits need the mrp module")
+        kit = self.env['product.product'].create({'name': 'Kit', 'type': 'consu'})
+        self.env['mrp.bom'].create({
+            'product_tmpl_id': kit.product_tmpl_id.id, 'product_qty': 1, 'type': 'phantom',
+            'bom_line_ids': [(0, 0, {'product_id': self.component_a.id, 'product_qty': 2}),
+                             (0, 0, {'product_id': self.component_b.id, 'product_qty': 1})]})
+        self._create_move(self.component_a, 4, self.supplier_location, self.stock_location)
+        self._create_move(self.component_b, 3, self.supplier_location, self.stock_location)
+        self._create_move(self.component_a, 2, self.stock_location, self.customer_location)
+        self._create_move(self.component_b, 1, self.stock_location, self.customer_location)
+        product_obj = self.env['product.product']
+        quantities = product_obj.get_stock_quantities_ept(self.warehouse, kit.ids)[kit.id]
+        self.assertEqual(quantities['qty_available'], 5)
+        self.assertEqual(quantities['free_qty'], 5)
+        # 5 free kits + 2 incoming kits - 1 outgoing kit
+        self.assertEqual(quantities['virtual_available'], 6)
+        self.assertEqual(product_obj.get_free_qty_ept(self.warehouse, kit.ids), {kit.id: 5})
@@ -17,6 +17,9 @@
         'data/chatgpt_model_data.xml',
         'data/mail_channel_data.xml',
         'data/user_partner_data.xml',
+        'data/ir_cron_data.xml',
+        'views/chatgpt_completion_cache_views.xml',
+        'views/chatgpt_usage_views.xml',
         'views/res_config_settings_views.xml',
     ],
     'external_dependencies': {'python': ['openai']},
@@ -2,5 +2,8 @@
 # Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
 
 from . import chatgpt_model
+from . import chatgpt_completion_cache
+from . import chatgpt_reply_queue
+from . import chatgpt_usage
 from . import mail_channel
 from . import res_config_settings
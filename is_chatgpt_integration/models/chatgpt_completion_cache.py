@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
+
+import hashlib
+import json
+import re
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+DEFAULT_CACHE_TTL_HOURS = 24
+DEFAULT_CACHE_SIZE = 1000
+
+
+class ChatGPTCompletionCache(models.Model):
+    _name = 'chatgpt.completion.cache'
+    _description = "ChatGPT Completion Cache"
+    _order = 'last_hit desc, id desc'
+
+    key = fields.Char(string='Key', required=True, readonly=True, index=True)
+    gpt_model = fields.Char(string='ChatGPT Model', readonly=True)
+    prompt = fields.Text(string='Prompt', readonly=True)
+    response = fields.Text(string='Response', readonly=True)
+    hit_count = fields.Integer(string='Hits', default=0, readonly=True)
+    last_hit = fields.Datetime(string='Last Used', default=fields.Datetime.now, readonly=True)
+
+    _sql_constraints = [
+        ('key_unique', 'unique(key)', 'The completion is already cached.'),
+    ]
+
+    @api.model
+    def _get_cache_settings(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        return {
+            'ttl_hours': int(ICP.get_param('is_chatgpt_integration.cache_ttl_hours') or DEFAULT_CACHE_TTL_HOURS),
+            'size': int(ICP.get_param('is_chatgpt_integration.cache_size') or DEFAULT_CACHE_SIZE),
+        }
+
+    @api.model
+    def _get_cache_key(self, request):
+        """Return the hash of the model, the parameters, the system prompt and the last user message of
+        a completion request, or False when the request is not deterministic and can not be cached.
+        The channel history is left out so that the same question asked in other conversations or
+        later in the same one hits the cache."""
+        if request.get('temperature') != 0.0:
+            return False
+        system_messages = [message for message in request['messages'] if message['role'] == 'system']
+        user_message = next((message for message in reversed(request['messages']) if message['role'] == 'user'), None)
+        if not user_message:
+            return False
+        messages = [{'role': message['role'], 'content': re.sub(r'\s+', ' ', message['content']).strip()}
+                    for message in system_messages + [user_message]]
+        payload = dict(request, messages=messages)
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    @api.model
+    def _lookup(self, keys):
+        """Return {key: response} of the valid cached completions, counting one hit per given key."""
+        keys = [key for key in keys if key]
+        if not keys:
+            return {}
+        settings = self._get_cache_settings()
+        if settings['ttl_hours'] <= 0:
+            return {}
+        limit_date = fields.Datetime.now() - timedelta(hours=settings['ttl_hours'])
+        entries = self.sudo().search([('key', 'in', keys), ('create_date', '>=', limit_date)])
+        for entry in entries:
+            entry.write({'hit_count': entry.hit_count + keys.count(entry.key), 'last_hit': fields.Datetime.now()})
+        return {entry.key: entry.response for entry in entries}
+
+    @api.model
+    def _store(self, key, request, response, hits=0):
+        """Cache a completion, hits counts the requests coalesced into the call that produced it."""
+        if not key or self._get_cache_settings()['ttl_hours'] <= 0:
+            return
+        self.sudo().search([('key', '=', key)]).unlink()
+        prompt = next((message['content'] for message in reversed(request['messages']) if message['role'] == 'user'), '')
+        self.sudo().create({
+            'key': key,
+            'gpt_model': request['model'],
+            'prompt': prompt,
+            'response': response,
+            'hit_count': hits,
+        })
+
+    @api.model
+    def _get_cache_statistics(self):
+        """Return (entries, hits, hit rate in percent), every entry was created by one miss."""
+        [(entries, hits)] = self.sudo()._read_group([], aggregates=['__count', 'hit_count:sum'])
+        hits = hits or 0
+        return entries, hits, round(100.0 * hits / (hits + entries), 2) if entries else 0.0
+
+    @api.autovacuum
+    def _gc_completion_cache(self):
+        self._apply_cache_limits()
+
+    @api.model
+    def _apply_cache_limits(self):
+        """Delete the expired completions and the least recently used ones above the cache size."""
+        settings = self._get_cache_settings()
+        limit_date = fields.Datetime.now() - timedelta(hours=max(settings['ttl_hours'], 0))
+        self.sudo().search([('create_date', '<', limit_date)]).unlink()
+        self.sudo().search([], offset=max(settings['size'], 0)).unlink()
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
+
+from openai import RateLimitError
+
+from odoo import api, fields, models, modules
+from odoo.tools import str2bool
+
+from ..tools import chatgpt_client
+from ..tools.chatgpt_context import estimate_tokens
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_GPT_MODEL = 'gpt-3.5-turbo'
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUEST_TIMEOUT = 60
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 30  # seconds, doubled on every attempt
+RATE_LIMIT_DELAY = 60  # seconds, when the API answers 429 without Retry-After
+QUOTA_RETRY_DELAY = 600  # seconds, when the user used up the token quota
+BATCH_SIZE = 20
+QUEUE_RETENTION_DAYS = 7
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds of a Retry-After header given in seconds or as an HTTP date,
+    RATE_LIMIT_DELAY when it is missing or invalid."""
+    if not value:
+        return RATE_LIMIT_DELAY
+    try:
+        return max(int(float(value)), 1)
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return RATE_LIMIT_DELAY
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+    return max(int((retry_date - datetime.now(timezone.utc)).total_seconds()), 1)
+
+
+class ChatGPTReplyQueue(models.Model):
+    _name = 'chatgpt.reply.queue'
+    _description = "ChatGPT Reply Queue"
+    _order = 'id'
+
+    channel_id = fields.Many2one('discuss.channel', string='Channel', required=True, ondelete='cascade', index=True)
+    message_id = fields.Many2one('mail.message', string='Message', ondelete='set null')
+    author_id = fields.Many2one('res.partner', string='Author', ondelete='set null')
+    user_id = fields.Many2one('res.users', string='User', ondelete='set null')
+    prompt = fields.Text(string='Prompt', required=True)
+    state = fields.Selection([('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')],
+                             string='State', default='pending', required=True, index=True)
+    attempts = fields.Integer(string='Attempts', default=0)
+    next_attempt = fields.Datetime(string='Next Attempt', default=fields.Datetime.now)
+    error = fields.Text(string='Error')
+
+    @api.model
+    def _enqueue(self, channel, message, prompt):
+        """Queue a reply for the given channel message and wake up the reply cron."""
+        job = self.sudo().create({
+            'channel_id': channel.id,
+            'message_id': message.id,
+            'author_id': message.author_id.id,
+            'user_id': self.env.uid,
+            'prompt': prompt,
+        })
+        self.env.ref('is_chatgpt_integration.ir_cron_chatgpt_reply_queue').sudo()._trigger()
+        return job
+
+    @api.model
+    def _get_queue_settings(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        gpt_model = DEFAULT_GPT_MODEL
+        gpt_model_id = ICP.get_param('is_chatgpt_integration.chatgp_model')
+        if gpt_model_id:
+            gpt_model = self.env['chatgpt.model'].sudo().browse(int(gpt_model_id)).exists().name or gpt_model
+        return {
+            'api_key': ICP.get_param('is_chatgpt_integration.openapi_api_key'),
+            'model': gpt_model,
+            'max_concurrency': max(int(ICP.get_param('is_chatgpt_integration.max_concurrency') or DEFAULT_MAX_CONCURRENCY), 1),
+            'timeout': int(ICP.get_param('is_chatgpt_integration.request_timeout') or DEFAULT_REQUEST_TIMEOUT),
+            'stub': bool(modules.module.current_test) or str2bool(ICP.get_param('is_chatgpt_integration.use_stub') or '0'),
+            'user_token_quota': int(ICP.get_param('is_chatgpt_integration.user_token_quota') or 0),
+        }
+
+    def _prepare_chatgpt_request(self, settings):
+        """Return the completion arguments of the job, built while the cursor is available."""
+        self.ensure_one()
+        return {
+            'messages': self.channel_id._get_chatgpt_messages(self.message_id, self.prompt),
+            'model': settings['model'],
+            'temperature': 0.0,
+        }
+
+    @staticmethod
+    def _call_chatgpt(client, request):
+        """Run one completion call, executed in a worker thread without any access to the database."""
+        try:
+            response = client.chat.completions.create(**request)
+        except RateLimitError as e:
+            if getattr(e, 'code', None) == 'insufficient_quota':
+                # the account has no credit left, waiting will not help
+                return {'status': 'error', 'content': str(e)}
+            response = getattr(e, 'response', None)
+            retry_after = response.headers.get('retry-after') if response is not None else None
+            return {'status': 'rate_limited', 'content': str(e), 'retry_after': parse_retry_after(retry_after)}
+        except Exception as e:
+            return {'status': 'error', 'content': str(e)}
+        usage = response.usage
+        return {
+            'status': 'done',
+            'content': response.choices[0].message.content,
+            'prompt_tokens': usage.prompt_tokens if usage else 0,
+            'completion_tokens': usage.completion_tokens if usage else 0,
+        }
+
+    @api.model
+    def _process_reply_queue(self):
+        """Cron: answer the pending jobs in batches, running at most max_concurrency API calls at a time."""
+        settings = self._get_queue_settings()
+        if not settings['api_key'] and not settings['stub']:
+            return
+        client = chatgpt_client.get_client(settings['api_key'], settings['timeout'], stub=settings['stub'])
+        user_chatgpt = self.env.ref('is_chatgpt_integration.user_chatgpt')
+        cron = self.env.ref('is_chatgpt_integration.ir_cron_chatgpt_reply_queue')
+        while True:
+            jobs = self.search([('state', '=', 'pending'), ('next_attempt', '<=', fields.Datetime.now())], limit=BATCH_SIZE)
+            if not jobs:
+                break
+            requests = {job: job._prepare_chatgpt_request(settings) for job in jobs}
+            jobs = jobs._filter_user_quota(requests, settings)
+            if not jobs:
+                continue
+            results = self._get_chatgpt_results([requests[job] for job in jobs], client, settings)
+            self.env['chatgpt.usage']._record_usage(jobs, [requests[job] for job in jobs], results)
+            retry_after = 0
+            for job, result in zip(jobs, results):
+                if result['status'] == 'done':
+                    job._post_reply(user_chatgpt, result['content'])
+                    job.write({'state': 'done', 'error': False})
+                elif result['status'] == 'rate_limited':
+                    retry_after = max(retry_after, result['retry_after'])
+                    job.write({'error': result['content']})
+                else:
+                    job._register_failure(user_chatgpt, result['content'])
+            if retry_after:
+                # the API is throttling the whole organization, pause the queue instead of failing the jobs
+                next_attempt = fields.Datetime.now() + timedelta(seconds=retry_after)
+                _logger.warning("ChatGPT rate limit reached, reply queue paused for %s seconds", retry_after)
+                self.search([('state', '=', 'pending'), ('next_attempt', '<', next_attempt)]).write({'next_attempt': next_attempt})
+                cron._trigger(at=next_attempt)
+            if not modules.module.current_test:
+                self.env.cr.commit()
+            if retry_after:
+                break
+
+    def _filter_user_quota(self, requests, settings):
+        """Return the jobs whose user has enough tokens left in the rolling hour of the user token quota,
+        the other jobs are postponed."""
+        quota = settings['user_token_quota']
+        if quota <= 0:
+            return self
+        used = self.env['chatgpt.usage']._get_user_recent_tokens(self.user_id.ids)
+        allowed = self.browse()
+        for job in self:
+            estimated = sum(estimate_tokens(message['content']) for message in requests[job]['messages'])
+            user_used = used.get(job.user_id.id, 0)
+            if user_used and user_used + estimated > quota:
+                continue
+            used[job.user_id.id] = user_used + estimated
+            allowed |= job
+        postponed = self - allowed
+        if postponed:
+            next_attempt = fields.Datetime.now() + timedelta(seconds=QUOTA_RETRY_DELAY)
+            _logger.info("ChatGPT token quota reached, replies %s postponed", postponed.ids)
+            postponed.write({'next_attempt': next_attempt})
+            self.env.ref('is_chatgpt_integration.ir_cron_chatgpt_reply_queue')._trigger(at=next_attempt)
+        return allowed
+
+    @api.model
+    def _get_chatgpt_results(self, requests, client, settings):
+        """Answer the requests from the completion cache and call the API once per distinct uncached
+        request, identical requests of the batch share the result of a single call. Only the first
+        request of a call is charged with its tokens, the others are flagged as cached.
+        The worker threads only receive the client and plain request dicts and make the HTTP calls,
+        every read and write of the database happens on the cron thread."""
+        cache = self.env['chatgpt.completion.cache']
+        keys = [cache._get_cache_key(request) for request in requests]
+        cached = cache._lookup(keys)
+        pending = {}
+        for index, (key, request) in enumerate(zip(keys, requests)):
+            if key not in cached:
+                pending.setdefault(key or index, []).append(index)
+        calls = list(pending.items())
+        call_requests = [requests[indexes[0]] for dummy, indexes in calls]
+        with ThreadPoolExecutor(max_workers=settings['max_concurrency']) as executor:
+            call_results = list(executor.map(partial(ChatGPTReplyQueue._call_chatgpt, client), call_requests))
+        results = [{'status': 'done', 'content': cached[key], 'cached': True} if key in cached else None for key in keys]
+        for (call_key, indexes), result in zip(calls, call_results):
+            if result['status'] == 'done' and keys[indexes[0]]:
+                cache._store(call_key, requests[indexes[0]], result['content'], hits=len(indexes) - 1)
+            results[indexes[0]] = result
+            for index in indexes[1:]:
+                results[index] = dict(result, cached=True, prompt_tokens=0, completion_tokens=0)
+        if calls:
+            cache._apply_cache_limits()
+        return results
+
+    def _post_reply(self, user_chatgpt, body):
+        self.ensure_one()
+        self.channel_id.with_user(user_chatgpt).message_post(
+            body=body, message_type='comment', subtype_xmlid='mail.mt_comment'
+        )
+
+    def _register_failure(self, user_chatgpt, error):
+        """Retry the job later with an exponential delay, give up and post the error after MAX_ATTEMPTS."""
+        self.ensure_one()
+        attempts = self.attempts + 1
+        _logger.warning("ChatGPT reply %s failed (attempt %s/%s): %s", self.id, attempts, MAX_ATTEMPTS, error)
+        if attempts >= MAX_ATTEMPTS:
+            self._post_reply(user_chatgpt, f"Error: {error}")
+            self.write({'state': 'failed', 'attempts': attempts, 'error': error})
+            return
+        next_attempt = fields.Datetime.now() + timedelta(seconds=RETRY_DELAY * 2 ** (attempts - 1))
+        self.write({'attempts': attempts, 'next_attempt': next_attempt, 'error': error})
+        self.env.ref('is_chatgpt_integration.ir_cron_chatgpt_reply_queue')._trigger(at=next_attempt)
+
+    @api.autovacuum
+    def _gc_reply_queue(self):
+        """Delete answered and failed jobs after QUEUE_RETENTION_DAYS."""
+        limit_date = fields.Datetime.now() - timedelta(days=QUEUE_RETENTION_DAYS)
+        self.sudo().search([('state', 'in', ('done', 'failed')), ('write_date', '<', limit_date)]).unlink()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
+
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+
+class ChatGPTUsage(models.Model):
+    _name = 'chatgpt.usage'
+    _description = "ChatGPT Usage"
+    _order = 'id desc'
+
+    user_id = fields.Many2one('res.users', string='User', readonly=True, index=True, ondelete='set null')
+    channel_id = fields.Many2one('discuss.channel', string='Channel', readonly=True, ondelete='set null')
+    gpt_model = fields.Char(string='ChatGPT Model', readonly=True)
+    prompt_tokens = fields.Integer(string='Prompt Tokens', readonly=True)
+    completion_tokens = fields.Integer(string='Completion Tokens', readonly=True)
+    total_tokens = fields.Integer(string='Total Tokens', compute='_compute_total_tokens', store=True)
+    cached = fields.Boolean(string='From Cache', readonly=True)
+
+    @api.depends('prompt_tokens', 'completion_tokens')
+    def _compute_total_tokens(self):
+        for usage in self:
+            usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+
+    @api.model
+    def _record_usage(self, jobs, requests, results):
+        """Create one usage line per answered reply queue job."""
+        vals_list = [{
+            'user_id': job.user_id.id,
+            'channel_id': job.channel_id.id,
+            'gpt_model': request['model'],
+            'prompt_tokens': result.get('prompt_tokens', 0),
+            'completion_tokens': result.get('completion_tokens', 0),
+            'cached': result.get('cached', False),
+        } for job, request, result in zip(jobs, requests, results) if result['status'] == 'done']
+        return self.sudo().create(vals_list)
+
+    @api.model
+    def _get_user_recent_tokens(self, user_ids, hours=1):
+        """Return {user id: tokens used during the last hours}."""
+        limit_date = fields.Datetime.now() - timedelta(hours=hours)
+        return {user.id: total for user, total in self.sudo()._read_group(
+            [('user_id', 'in', user_ids), ('create_date', '>=', limit_date)], ['user_id'], ['total_tokens:sum'])}
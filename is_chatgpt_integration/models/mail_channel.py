@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
 # Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
 
-from openai import OpenAI
+import logging
+
 from odoo import api, fields, models, _
-from odoo.exceptions import UserError
+from odoo.tools import html2plaintext
+
+from ..tools.chatgpt_context import context_cache, estimate_tokens, trim_to_budget
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_TOKEN_BUDGET = 3000
+DEFAULT_CONTEXT_MAX_MESSAGES = 20
 
 
 class Channel(models.Model):
@@ -13,7 +21,6 @@ class Channel(models.Model):
         rdata = super(Channel, self)._notify_thread(message, msg_vals=msg_vals, **kwargs)
         try:
             chatgpt_channel_id = self.env.ref('is_chatgpt_integration.channel_chatgpt')
-            user_chatgpt = self.env.ref("is_chatgpt_integration.user_chatgpt")
             partner_chatgpt = self.env.ref("is_chatgpt_integration.partner_chatgpt")
 
             author_id = msg_vals.get('author_id')
@@ -29,48 +36,58 @@ class Channel(models.Model):
                 and (str(partner_chatgpt.name or '') + ', ' in msg_vals.get('record_name', '') or 'ChatGPT,' in msg_vals.get('record_name', ''))
                 and self.channel_type == 'chat'
             ):
-                res = self._get_chatgpt_response(prompt=prompt)
-                self.with_user(user_chatgpt).message_post(
-                    body=res, message_type='comment', subtype_xmlid='mail.mt_comment'
-                )
+                self.env['chatgpt.reply.queue']._enqueue(self, message, prompt)
 
             elif (
                 author_id != partner_chatgpt.id
                 and msg_vals.get('model', '') == 'discuss.channel'
                 and msg_vals.get('res_id', 0) == chatgpt_channel_id.id
             ):
-                res = self._get_chatgpt_response(prompt=prompt)
-                chatgpt_channel_id.with_user(user_chatgpt).message_post(
-                    body=res, message_type='comment', subtype_xmlid='mail.mt_comment'
-                )
-        except Exception as e:
-            print(f"Error in _notify_thread: {e}")
+                self.env['chatgpt.reply.queue']._enqueue(chatgpt_channel_id, message, prompt)
+        except Exception:
+            _logger.exception("Error while queuing the ChatGPT reply")
         return rdata
 
-    def _get_chatgpt_response(self, prompt):
+    def _get_chatgpt_context_settings(self):
         ICP = self.env['ir.config_parameter'].sudo()
-        api_key = ICP.get_param('is_chatgpt_integration.openapi_api_key')
-        gpt_model_id = ICP.get_param('is_chatgpt_integration.chatgp_model')
-        gpt_model = 'gpt-3.5-turbo'
+        return {
+            'system_prompt': ICP.get_param('is_chatgpt_integration.system_prompt') or '',
+            'token_budget': int(ICP.get_param('is_chatgpt_integration.context_token_budget') or DEFAULT_CONTEXT_TOKEN_BUDGET),
+            'max_messages': int(ICP.get_param('is_chatgpt_integration.context_max_messages') or DEFAULT_CONTEXT_MAX_MESSAGES),
+        }
 
-        if not api_key:
-            return "Error: Missing API key for ChatGPT."
+    def _get_chatgpt_messages(self, message, prompt):
+        """Build the chat completion messages answering the given message: the system prompt and the
+        recent plain text history of the channel, truncated to the token budget. The history is cached
+        per channel so that every turn only reads the messages posted since the previous one."""
+        self.ensure_one()
+        settings = self._get_chatgpt_context_settings()
+        system_prompt = settings['system_prompt']
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        if not message:
+            return messages + [{"role": "user", "content": html2plaintext(prompt or '').strip()}]
+        partner_chatgpt = self.env.ref("is_chatgpt_integration.partner_chatgpt")
+        cache_key = (self.env.cr.dbname, self.id)
+        last_id, entries = context_cache.get(cache_key) or (0, ())
+        if last_id > message.id:
+            last_id, entries = 0, ()
+        new_messages = self.env['mail.message'].sudo().search([
+            ('model', '=', 'discuss.channel'), ('res_id', '=', self.id), ('message_type', '=', 'comment'),
+            ('id', '>', last_id), ('id', '<=', message.id),
+        ], order='id desc', limit=settings['max_messages'])
+        entries = list(entries)
+        for history_message in reversed(new_messages):
+            content = html2plaintext(history_message.body or '').strip()
+            if not content:
+                continue
+            role = 'assistant' if history_message.author_id == partner_chatgpt else 'user'
+            entries.append((history_message.id, role, content, estimate_tokens(content)))
+        if not entries or entries[-1][0] != message.id:
+            content = html2plaintext(prompt or '').strip()
+            entries.append((message.id, 'user', content, estimate_tokens(content)))
+        budget = settings['token_budget'] - (estimate_tokens(system_prompt) if system_prompt else 0)
+        entries = trim_to_budget(entries[-settings['max_messages']:], budget)
+        context_cache.set(cache_key, message.id, entries)
 
-        try:
-            if gpt_model_id:
-                gpt_model = self.env['chatgpt.model'].browse(int(gpt_model_id)).name
-        except Exception as ex:
-            print(f"Error retrieving GPT Model: {ex}")
-
-        try:
-            client = OpenAI(api_key=api_key)
-            messages = [{"role": "user", "content": prompt}]
-            response = client.chat.completions.create(
-                messages=messages,
-                model=gpt_model,
-                temperature=0.0
-            )
-            response_message = response.choices[0].message.content
-            return response_message
-        except Exception as e:
-            return f"Error: {str(e)}"
+        messages += [{"role": role, "content": content} for dummy, role, content, dummy in entries]
+        return messages
@@ -12,3 +12,21 @@ class ResConfigSettings(models.TransientModel):
 
     openapi_api_key = fields.Char(string="API Key", help="Provide the API key here", config_parameter="is_chatgpt_integration.openapi_api_key")
     chatgpt_model_id = fields.Many2one('chatgpt.model', 'ChatGPT Model', ondelete='cascade', default=_get_default_chatgpt_model,  config_parameter="is_chatgpt_integration.chatgp_model")
+    chatgpt_max_concurrency = fields.Integer(string="Concurrent Requests", default=4, help="Maximum number of ChatGPT requests sent at the same time", config_parameter="is_chatgpt_integration.max_concurrency")
+    chatgpt_request_timeout = fields.Integer(string="Request Timeout", default=60, help="Timeout of a ChatGPT request in seconds", config_parameter="is_chatgpt_integration.request_timeout")
+    chatgpt_system_prompt = fields.Char(string="System Prompt", help="Instructions sent to ChatGPT before the conversation", config_parameter="is_chatgpt_integration.system_prompt")
+    chatgpt_context_token_budget = fields.Integer(string="Context Token Budget", default=3000, help="Maximum estimated tokens of the conversation history sent with a question", config_parameter="is_chatgpt_integration.context_token_budget")
+    chatgpt_context_max_messages = fields.Integer(string="Context Messages", default=20, help="Maximum number of channel messages sent with a question", config_parameter="is_chatgpt_integration.context_max_messages")
+    chatgpt_cache_ttl_hours = fields.Integer(string="Cache Lifetime", default=24, help="Hours a ChatGPT answer is reused for the same question, 0 disables the cache", config_parameter="is_chatgpt_integration.cache_ttl_hours")
+    chatgpt_cache_size = fields.Integer(string="Cache Size", default=1000, help="Maximum number of cached ChatGPT answers", config_parameter="is_chatgpt_integration.cache_size")
+    chatgpt_user_token_quota = fields.Integer(string="Tokens per User and Hour", help="Maximum tokens a user can use in one hour, further questions are answered later. 0 means no limit", config_parameter="is_chatgpt_integration.user_token_quota")
+    chatgpt_cache_entries = fields.Integer(string="Cached Answers", compute='_compute_chatgpt_cache_statistics')
+    chatgpt_cache_hits = fields.Integer(string="Cache Hits", compute='_compute_chatgpt_cache_statistics')
+    chatgpt_cache_hit_rate = fields.Float(string="Cache Hit Rate (%)", compute='_compute_chatgpt_cache_statistics')
+
+    def _compute_chatgpt_cache_statistics(self):
+        entries, hits, hit_rate = self.env['chatgpt.completion.cache']._get_cache_statistics()
+        for settings in self:
+            settings.chatgpt_cache_entries = entries
+            settings.chatgpt_cache_hits = hits
+            settings.chatgpt_cache_hit_rate = hit_rate
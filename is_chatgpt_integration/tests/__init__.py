@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_chatgpt_completion_cache
+from . import test_chatgpt_reply_queue
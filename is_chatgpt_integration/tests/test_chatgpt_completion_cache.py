@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestChatGPTCompletionCache(TransactionCase):
+
+    def _request(self, *messages, temperature=0.0):
+        return {
+            'messages': [{'role': role, 'content': content} for role, content in messages],
+            'model': 'gpt-3.5-turbo',
+            'temperature': temperature,
+        }
+
+    def test_cache_key_ignores_history(self):
+        cache = self.env['chatgpt.completion.cache']
+        key = cache._get_cache_key(self._request(('system', 'Be brief.'), ('user', 'What are your opening hours?')))
+        other_history = cache._get_cache_key(self._request(
+            ('system', 'Be brief.'), ('user', 'Hello'), ('assistant', 'Hi!'), ('user', 'What are your  opening hours? ')))
+        self.assertTrue(key)
+        self.assertEqual(key, other_history)
+
+    def test_cache_key_depends_on_prompt(self):
+        cache = self.env['chatgpt.completion.cache']
+        key = cache._get_cache_key(self._request(('system', 'Be brief.'), ('user', 'What are your opening hours?')))
+        self.assertNotEqual(key, cache._get_cache_key(self._request(('system', 'Be formal.'), ('user', 'What are your opening hours?'))))
+        self.assertNotEqual(key, cache._get_cache_key(self._request(('system', 'Be brief.'), ('user', 'Where is your shop?'))))
+        self.assertFalse(cache._get_cache_key(self._request(('user', 'What are your opening hours?'), temperature=0.7)))
+
+    def test_lookup_and_store(self):
+        cache = self.env['chatgpt.completion.cache']
+        request = self._request(('user', 'What are your opening hours?'))
+        key = cache._get_cache_key(request)
+        self.assertEqual(cache._lookup([key]), {})
+        cache._store(key, request, 'From 9 to 5.')
+        self.assertEqual(cache._lookup([key, key]), {key: 'From 9 to 5.'})
+        entries, hits, dummy = cache._get_cache_statistics()
+        self.assertEqual((entries, hits), (1, 2))
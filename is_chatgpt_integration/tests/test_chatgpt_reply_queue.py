@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+from openai import RateLimitError
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+from ..models.chatgpt_reply_queue import MAX_ATTEMPTS, RATE_LIMIT_DELAY, ChatGPTReplyQueue, parse_retry_after
+
+
+@tagged('post_install', '-at_install')
+class TestChatGPTReplyQueue(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner_chatgpt = cls.env.ref('is_chatgpt_integration.partner_chatgpt')
+        cls.channel = cls.env['discuss.channel'].create({'name': 'ChatGPT Queue Test'})
+
+    def _create_job(self, prompt='What are your opening hours?', **values):
+        return self.env['chatgpt.reply.queue'].create(dict({
+            'channel_id': self.channel.id,
+            'user_id': self.env.uid,
+            'prompt': prompt,
+        }, **values))
+
+    def _get_replies(self):
+        return self.channel.message_ids.filtered(lambda message: message.author_id == self.partner_chatgpt)
+
+    def _patch_call(self, result):
+        return patch.object(ChatGPTReplyQueue, '_call_chatgpt', staticmethod(lambda client, request: dict(result)))
+
+    def test_reply_posted(self):
+        job = self._create_job()
+        self.env['chatgpt.reply.queue']._process_reply_queue()
+        self.assertEqual(job.state, 'done')
+        self.assertIn('What are your opening hours?', self._get_replies().body)
+        self.assertEqual(self.env['chatgpt.usage'].search_count([('channel_id', '=', self.channel.id)]), 1)
+
+    def test_identical_requests_share_one_call(self):
+        jobs = self._create_job() | self._create_job()
+        calls = []
+
+        def call_chatgpt(client, request):
+            calls.append(request)
+            return {'status': 'done', 'content': 'From 9 to 5.', 'prompt_tokens': 10, 'completion_tokens': 5}
+
+        with patch.object(ChatGPTReplyQueue, '_call_chatgpt', staticmethod(call_chatgpt)):
+            self.env['chatgpt.reply.queue']._process_reply_queue()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(set(jobs.mapped('state')), {'done'})
+        self.assertEqual(len(self._get_replies()), 2)
+
+    def test_failure_retried(self):
+        job = self._create_job()
+        with self._patch_call({'status': 'error', 'content': 'Server error'}):
+            self.env['chatgpt.reply.queue']._process_reply_queue()
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.error, 'Server error')
+        self.assertGreater(job.next_attempt, fields.Datetime.now())
+        self.assertFalse(self._get_replies())
+
+    def test_failure_gives_up(self):
+        job = self._create_job(attempts=MAX_ATTEMPTS - 1)
+        with self._patch_call({'status': 'error', 'content': 'Server error'}):
+            self.env['chatgpt.reply.queue']._process_reply_queue()
+        self.assertEqual(job.state, 'failed')
+        self.assertEqual(job.attempts, MAX_ATTEMPTS)
+        self.assertIn('Server error', self._get_replies().body)
+
+    def test_future_jobs_wait(self):
+        job = self._create_job(next_attempt=fields.Datetime.now() + timedelta(hours=1))
+        self.env['chatgpt.reply.queue']._process_reply_queue()
+        self.assertEqual(job.state, 'pending')
+        self.assertFalse(self._get_replies())
+
+    def test_rate_limit_pauses_queue(self):
+        job = self._create_job()
+        other_job = self._create_job('Where is your shop?', next_attempt=fields.Datetime.now() + timedelta(hours=1))
+        waiting_job = self._create_job('Do you ship abroad?', next_attempt=fields.Datetime.now() + timedelta(seconds=10))
+        with self._patch_call({'status': 'rate_limited', 'content': 'Too many requests', 'retry_after': 120}):
+            self.env['chatgpt.reply.queue']._process_reply_queue()
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.attempts, 0)
+        self.assertGreaterEqual(job.next_attempt, fields.Datetime.now() + timedelta(seconds=110))
+        self.assertEqual(waiting_job.next_attempt, job.next_attempt)
+        self.assertGreater(other_job.next_attempt, job.next_attempt)
+        self.assertFalse(self._get_replies())
+
+    def test_user_token_quota(self):
+        self.env['ir.config_parameter'].sudo().set_param('is_chatgpt_integration.user_token_quota', 100)
+        self.env['chatgpt.usage'].create({'user_id': self.env.uid, 'gpt_model': 'gpt-3.5-turbo', 'prompt_tokens': 95})
+        job = self._create_job()
+        self.env['chatgpt.reply.queue']._process_reply_queue()
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.attempts, 0)
+        self.assertGreater(job.next_attempt, fields.Datetime.now())
+        self.assertFalse(self._get_replies())
+
+    def _raise_rate_limit(self, headers=None, code=None):
+        response = httpx.Response(429, headers=headers or {},
+                                  request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions'))
+
+        def create(**kwargs):
+            raise RateLimitError('Rate limit reached', response=response, body={'code': code} if code else None)
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    def test_call_rate_limited(self):
+        result = ChatGPTReplyQueue._call_chatgpt(self._raise_rate_limit({'retry-after': '7'}), {})
+        self.assertEqual(result['status'], 'rate_limited')
+        self.assertEqual(result['retry_after'], 7)
+
+    def test_call_insufficient_quota(self):
+        result = ChatGPTReplyQueue._call_chatgpt(self._raise_rate_limit(code='insufficient_quota'), {})
+        self.assertEqual(result['status'], 'error')
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('12'), 12)
+        self.assertEqual(parse_retry_after('0.5'), 1)
+        self.assertEqual(parse_retry_after(None), RATE_LIMIT_DELAY)
+        self.assertEqual(parse_retry_after('soon'), RATE_LIMIT_DELAY)
+        retry_date = datetime.now(timezone.utc) + timedelta(seconds=90)
+        self.assertAlmostEqual(parse_retry_after(format_datetime(retry_date, usegmt=True)), 90, delta=2)
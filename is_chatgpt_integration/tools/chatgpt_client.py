@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
+
+import threading
+from types import SimpleNamespace
+
+from openai import OpenAI
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class ChatGPTStubClient:
+    """Local stand-in for the OpenAI client, used by tests and when the stub setting is enabled.
+    It answers every completion with the last user message, without any network call."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+
+    def _create_completion(self, messages, model, **kwargs):
+        prompt = next((message['content'] for message in reversed(messages) if message['role'] == 'user'), '')
+        content = "Stub reply: %s" % prompt
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt.split()), completion_tokens=len(content.split())),
+        )
+
+
+def get_client(api_key, timeout, stub=False):
+    """Return a client shared by all workers of this process for the given key and timeout.
+    Retries are handled by the reply queue, so the client itself does not retry."""
+    if stub:
+        return ChatGPTStubClient()
+    key = (api_key, timeout)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+        return _clients[key]
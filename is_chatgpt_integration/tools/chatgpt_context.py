@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019-Present InTechual Solutions. (<https://intechualsolutions.com/>)
+
+import threading
+from collections import OrderedDict
+
+CHARS_PER_TOKEN = 4
+MESSAGE_TOKEN_OVERHEAD = 4  # role and separators added by the chat format
+
+
+def estimate_tokens(text):
+    """Cheap local estimate of the number of tokens of a text, about four characters per token."""
+    return (len(text or '') + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN + MESSAGE_TOKEN_OVERHEAD
+
+
+def trim_to_budget(entries, budget):
+    """Keep the most recent entries whose tokens fit in the budget, the last entry is always kept.
+    Entries are tuples (message id, role, content, tokens)."""
+    kept = []
+    total = 0
+    for entry in reversed(entries):
+        if kept and total + entry[3] > budget:
+            break
+        kept.append(entry)
+        total += entry[3]
+    kept.reverse()
+    return kept
+
+
+class ChannelContextCache:
+    """Per process LRU cache of the assembled history of channels, {key: (last message id, entries)}."""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, last_id, entries):
+        with self._lock:
+            self._data[key] = (last_id, tuple(entries))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+context_cache = ChannelContextCache()
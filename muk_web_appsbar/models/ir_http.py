@@ -13,8 +13,10 @@ class IrHttp(models.AbstractModel):
     def session_info(self):
         result = super(IrHttp, self).session_info()
         if request.env.user._is_internal():
-            for company in request.env.user.company_ids.with_context(bin_size=True):
-                result['user_companies']['allowed_companies'][company.id].update({
-                    'has_appsbar_image': bool(company.appbar_image),
+            allowed_companies = result['user_companies']['allowed_companies']
+            appsbar_image_company_ids = request.env.user.company_ids._get_appsbar_image_company_ids()
+            for company_id in allowed_companies:
+                allowed_companies[company_id].update({
+                    'has_appsbar_image': company_id in appsbar_image_company_ids,
                 })
         return result
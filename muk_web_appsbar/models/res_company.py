@@ -1,4 +1,4 @@
-from odoo import models, fields
+from odoo import models, fields, api, tools
 
 
 class ResCompany(models.Model):
@@ -13,3 +13,19 @@ class ResCompany(models.Model):
         string='Apps Menu Footer Image',
         attachment=True
     )
+
+    #----------------------------------------------------------
+    # Functions
+    #----------------------------------------------------------
+
+    def _get_appsbar_image_company_ids(self):
+        companies = self.sudo().sorted('id')
+        return self._get_appsbar_image_company_ids_cached(
+            tuple(companies.ids), tuple(companies.mapped('write_date'))
+        )
+
+    @api.model
+    @tools.ormcache('company_ids', 'write_dates')
+    def _get_appsbar_image_company_ids_cached(self, company_ids, write_dates):
+        companies = self.sudo().browse(company_ids).with_context(bin_size=True)
+        return frozenset(company.id for company in companies if company.appbar_image)
@@ -1,12 +1,15 @@
 import re
 import base64
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.tools import misc
 
 from odoo.addons.base.models.assetsbundle import EXTENSIONS
 
 
+COLOR_VARIABLE_REGEX = re.compile(r'\$mk_(\w+)\:?\s(.*?);')
+
+
 class ScssEditor(models.AbstractModel):
     
     _inherit = 'web_editor.assets'
@@ -23,8 +26,9 @@ class ScssEditor(models.AbstractModel):
 
     @api.model
     def _get_colors_asset(self, custom_url):
+        path = custom_url.lstrip('/')
         return self.env['ir.asset'].search([
-            ('path', 'like', custom_url)
+            ('path', 'in', [path, f'/{path}'])
         ])
 
     @api.model
@@ -40,24 +44,47 @@ class ScssEditor(models.AbstractModel):
         with misc.file_open(url.strip('/'), 'rb', filter_ext=EXTENSIONS) as f:
             return f.read()
 
-    def _get_color_variable(self, content, variable):
-        value = re.search(fr'\$mk_{variable}\:?\s(.*?);', content)
-        return value and value.group(1)
+    @api.model
+    def _get_colors_cache_key(self, url, bundle):
+        custom_url = self._make_custom_asset_url(url, bundle)
+        if self._get_data_from_url(custom_url)['customized']:
+            attachment = self._get_colors_attachment(custom_url)
+            if attachment:
+                return attachment[:1].checksum
+        return url
+
+    @api.model
+    @tools.ormcache('key')
+    def _get_cached_color_variables(self, key, url, bundle):
+        content = self._get_colors_from_url(url, bundle)
+        return tools.frozendict(
+            self._parse_color_variables(content.decode('utf-8'))
+        )
+
+    def _parse_color_variables(self, content):
+        variables = {}
+        for match in COLOR_VARIABLE_REGEX.finditer(content):
+            variables.setdefault(match.group(1), match.group(2))
+        return variables
 
     def _get_color_variables(self, content, variables):
+        parsed = self._parse_color_variables(content)
         return {
-            var: self._get_color_variable(content, var) 
+            var: parsed.get(var)
             for var in variables
         }
 
     def _replace_color_variables(self, content, variables):
-        for variable in variables:
-            content = re.sub(
-                fr'{variable["name"]}\:?\s(.*?);', 
-                f'{variable["name"]}: {variable["value"]};', 
-                content
-            )
-        return content
+        values = {
+            variable['name']: variable['value']
+            for variable in variables
+        }
+        def replace(match):
+            name = match.group(1)
+            if name not in values:
+                return match.group(0)
+            return f'$mk_{name}: {values[name]};'
+        return COLOR_VARIABLE_REGEX.sub(replace, content)
 
     @api.model
     def _save_color_asset(self, url, bundle, content):
@@ -105,15 +132,24 @@ class ScssEditor(models.AbstractModel):
     # ----------------------------------------------------------
 
     def get_color_variables_values(self, url, bundle, variables):
-        content = self._get_colors_from_url(url, bundle)
-        return self._get_color_variables(
-            content.decode('utf-8'), variables
+        parsed = self._get_cached_color_variables(
+            self._get_colors_cache_key(url, bundle), url, bundle
         )
+        return {
+            var: parsed.get(var)
+            for var in variables
+        }
     
     def replace_color_variables_values(self, url, bundle, variables):
+        current = self.get_color_variables_values(
+            url, bundle, [variable['name'] for variable in variables]
+        )
+        if all(current[var['name']] == var['value'] for var in variables):
+            return
         original = self._get_colors_from_url(url, bundle).decode('utf-8')
         content = self._replace_color_variables(original, variables)
-        self._save_color_asset(url, bundle, content)
+        if content != original:
+            self._save_color_asset(url, bundle, content)
 
     def reset_color_asset(self, url, bundle):
         custom_url = self._make_custom_asset_url(url, bundle)
@@ -64,6 +64,7 @@
                              'views/seller_view.xml',
                              'views/mp_product_view.xml',
                              'views/mp_sol_view.xml',
+                             'views/marketplace_revenue_report_view.xml',
                              'views/account_invoice_view.xml',
                              'views/seller_review_view.xml',
                              'views/website_mp_product_template.xml',
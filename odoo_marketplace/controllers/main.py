@@ -24,7 +24,6 @@ from odoo.addons.web.controllers.utils import ensure_db
 from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
 from odoo import http
 from odoo.http import request
-import base64
 from odoo.tools.translate import _
 from odoo.exceptions import UserError
 from odoo import SUPERUSER_ID
@@ -43,8 +42,28 @@ PPR = 4   # Products Per Row
 SPG = 20  # Shops/sellers Per Page
 SPR = 4   # Shops/sellers Per Row
 
+# Orders allowed on the seller and shop directories, all of them are served by an index or a stored field
+SELLER_DIRECTORY_ORDERS = ['website_sequence desc', 'name asc', 'name desc', 'published_average_rating desc', 'create_date desc']
+SHOP_DIRECTORY_ORDERS = ['website_sequence desc', 'name asc', 'name desc', 'create_date desc']
+
+
+def get_directory_order(post, allowed_orders):
+    """ Return the order of a seller or shop directory page, orders sent by the client are restricted to
+        allowed_orders, the first one being the default. id is added to be sure that order is a unique sort key """
+    order = post.get('order')
+    if order not in allowed_orders:
+        order = allowed_orders[0]
+    return 'is_published desc, %s, id desc' % order
+
+
 marketplace_domain = [('sale_ok', '=', True), ('state', '=', "approved")]
 
+# Images served by /marketplace/image: {model: {field: (stored resized variant field, variant max size)}}
+MP_IMAGE_FIELDS = {
+    'res.partner': {'profile_image': ('profile_image_256', 256), 'profile_banner': ('profile_banner_1024', 1024)},
+    'seller.shop': {'shop_logo': ('shop_logo_512', 512), 'shop_banner': ('shop_banner_1024', 1024)},
+}
+
 class AuthSignupHome(Website):
 
     @http.route(website=True, auth="public", sitemap=False)
@@ -242,29 +261,26 @@ class MarketplaceSellerProfile(http.Controller):
             pricelist = env['product.pricelist'].sudo().browse(context['pricelist'])
 
         ## calculating seller total sales order count
-        sales_count = 0
-        all_products = request.env['product.template'].sudo().search(
-            [("marketplace_seller_id", "=", seller.sudo().id)])
-        for prod in all_products.with_user(SUPERUSER_ID):
-            sales_count += prod.sales_count
+        sales_count = seller.seller_sales_count()
 
         attrib_list = request.httprequest.args.getlist('attrib')
         url_for_keep = url
         keep = QueryURL(url_for_keep, category=category and int(
             category), search=search, attrib=attrib_list)
 
-        seller_product_ids = request.env["product.template"].search([("marketplace_seller_id", "=", seller.id)])
-
-        product_count = request.env["product.template"].sudo().search_count([('sale_ok', '=', True), ('status', '=', "approved"), ("website_published", "=", True), ("id", "in", seller_product_ids.ids)])
+        website = request.env['website'].get_current_website()
+        product_obj = request.env['product.template']
+        listing_stamp = product_obj._get_mp_listing_stamp(seller.id)
+        product_count = product_obj._get_mp_listing_count(seller.id, website.id, False, listing_stamp)
         pager = request.website.pager(url=url, total=product_count, page=page, step=ppg, scope=7, url_args=post)
-        products = request.env['product.template'].sudo().search([('sale_ok', '=', True), ('status', '=', "approved"),("marketplace_seller_id", "=", seller.id)], limit=ppg, offset=pager['offset'], order=' website_sequence desc')
+        products = product_obj.sudo().browse(product_obj._get_mp_listing_ids(seller.id, website.id, False, listing_stamp, pager['offset'], ppg))
         from_currency = env['res.users'].sudo().browse(uid).company_id.currency_id
         to_currency = pricelist.currency_id
         compute_currency = lambda price: env['res.currency'].sudo()._compute(from_currency, to_currency, price)
 
-        recommend_id = request.env['seller.recommendation'].search([('seller_id', '=', seller.id), ('customer_id', '=', request.env.user.partner_id.id)], limit=1)
-        fiscal_position = request.env['website'].get_current_website().fiscal_position_id.sudo()
-        website= request.env['website'].get_current_website()
+        recommend_id = False
+        if not request.website.is_public_user():
+            recommend_id = request.env['seller.recommendation'].search([('seller_id', '=', seller.id), ('customer_id', '=', request.env.user.partner_id.id)], limit=1)
         products_prices = lazy(lambda: products._get_sales_prices(website))
         request_args = request.httprequest.args
         attrib_list = request_args.getlist('attribute_value')
@@ -303,8 +319,7 @@ class MarketplaceSellerProfile(http.Controller):
             "product_count": int(product_count),
             'get_product_prices': lambda product: lazy(lambda: products_prices[product.id]),
         }
-        website_sale_wishlist = request.env['ir.module.module'].sudo().search([('state', '=', 'installed'), ('name', '=', 'website_sale_wishlist')])
-        if website_sale_wishlist:
+        if 'product.wishlist' in request.env:
             values['products_in_wishlist'] = request.env['product.wishlist'].current().product_id.product_tmpl_id
         return request.render("odoo_marketplace.mp_seller_profile", values)
 
@@ -395,39 +410,39 @@ class MarketplaceSellerProfile(http.Controller):
             'seller_obj': seller_obj,
             'get_product_prices': lambda product: lazy(lambda: products_prices[product.id]),
         }
-        website_sale_wishlist = request.env['ir.module.module'].sudo().search([('state', '=', 'installed'), ('name', '=', 'website_sale_wishlist')])
-        if website_sale_wishlist:
+        if 'product.wishlist' in request.env:
             values['products_in_wishlist'] = request.env['product.wishlist'].current().product_id.product_tmpl_id
         return request.env['ir.qweb']._render("odoo_marketplace.shop_recently_product", values, engine='ir.qweb')
 
-    @http.route(['/marketplace/image/<int:partner_id>/<model_name>/<field_name>'], type='http', auth="public", website=True)
-    def user_avatar(self, partner_id,model_name, field_name, **post):
-        status, headers, content = request.env['ir.http'].binary_content(
-            model=model_name, id=partner_id, field=field_name, default_mimetype='image/png', env=request.env(user=odoo.SUPERUSER_ID))
-
-        if not content:
-            img_path = odoo.modules.get_module_resource(
-                'web', 'static/src/img', 'placeholder.png')
-            with open(img_path, 'rb') as f:
-                image = f.read()
-            content = image.encode('base64')
-        if status == 304:
-            return werkzeug.wrappers.Response(status=304)
-        image_base64 = base64.b64decode(content)
-        headers.append(('Content-Length', len(image_base64)))
-        response = request.make_response(image_base64, headers)
-        response.status = str(status)
+    @http.route(['/marketplace/image/<int:partner_id>/<model_name>/<field_name>',
+        '/marketplace/image/<int:partner_id>/<model_name>/<field_name>/<int:width>x<int:height>'], type='http', auth="public", website=True)
+    def user_avatar(self, partner_id, model_name, field_name, width=0, height=0, unique=False, **post):
+        """ Serve seller/shop images from the filestore, using the stored resized variant when it is big enough"""
+        image_fields = MP_IMAGE_FIELDS.get(model_name, {})
+        if field_name not in image_fields:
+            raise request.not_found()
+        record = request.env[model_name].sudo().browse(partner_id).exists()
+        if not record:
+            raise request.not_found()
+        variant_field, variant_size = image_fields[field_name]
+        if width and height and max(width, height) <= variant_size and record[variant_field]:
+            field_name = variant_field
+        stream = request.env['ir.binary']._get_image_stream_from(
+            record, field_name, width=width, height=height)
+        send_file_kwargs = {}
+        if unique:
+            send_file_kwargs.update(immutable=True, max_age=http.STATIC_CACHE_LONG)
+        response = stream.get_response(**send_file_kwargs)
+        response.headers['Content-Security-Policy'] = "default-src 'none'"
         return response
 
     def _get_search_order(self, post):
-        # OrderBy will be parsed in orm and so no direct sql injection
-        # id is added to be sure that order is a unique sort key
-        return 'is_published desc,%s , id desc' % post.get('order', 'website_sequence desc')
+        return get_directory_order(post, SELLER_DIRECTORY_ORDERS)
 
     def _get_seller_search_domain(self, search):
         domain = [("website_published", "=", True), ("seller", '=', True), ("state", "=", "approved")]
         if search:
-            for srch in search.split(" "):
+            for srch in search.split():
                 domain += [('name', 'ilike', srch)]
         return domain
 
@@ -458,9 +473,10 @@ class MarketplaceSellerProfile(http.Controller):
         if search:
             post["search"] = search
 
+        # The page is rendered with a fixed number of queries: counts, one page search and the card values
         seller_obj = request.env['res.partner']
         seller_count = seller_obj.sudo().search_count(domain)
-        total_active_seller = seller_obj.sudo().search_count(self._get_seller_search_domain(""))
+        total_active_seller = seller_obj.sudo().search_count(self._get_seller_search_domain("")) if search else seller_count
         pager = request.website.pager(url=url, total=seller_count, page=page, step=ppg, scope=7, url_args=post)
         seller_objs = seller_obj.sudo().search(domain, limit=ppg, offset=pager['offset'], order=self._get_search_order(post))
 
@@ -475,6 +491,7 @@ class MarketplaceSellerProfile(http.Controller):
             'rows': SPR,
             'keep': keep,
             'total_active_seller' : total_active_seller,
+            'seller_cards': seller_objs._get_seller_card_values(with_sales=request.website.mp_sale_count),
         }
         return request.render("odoo_marketplace.sellers_list", values)
 
@@ -567,28 +584,29 @@ class MarketplaceSellerShop(http.Controller):
             pricelist = env['product.pricelist'].sudo().browse(context['pricelist'])
 
         # Calculate seller total sales count
-        sales_count = 0
-        all_products = request.env['product.template'].sudo().search(
-            [("marketplace_seller_id", "=", shop_obj.sudo().seller_id.id)])
-        for prod in all_products.with_user(SUPERUSER_ID):
-            sales_count += prod.sales_count
+        sales_count = shop_obj.sudo().seller_id.seller_sales_count()
 
         attrib_list = request.httprequest.args.getlist('attrib')
         url_for_keep = '/seller/shop/' + str(shop_obj.url_handler)
         keep = QueryURL(url_for_keep, category=category and int(
             category), search=search, attrib=attrib_list)
 
-        product_count = request.env["product.template"].sudo().search_count([('sale_ok', '=', True), ('status', '=', "approved"), ("website_published", "=", True), ("id", "in", shop_obj.sudo().seller_product_ids.ids)])
+        website = request.env['website'].get_current_website()
+        seller_id = shop_obj.sudo().seller_id.id
+        product_obj = env['product.template']
+        listing_stamp = product_obj._get_mp_listing_stamp(seller_id, shop_obj.id)
+        product_count = product_obj._get_mp_listing_count(seller_id, website.id, shop_obj.id, listing_stamp)
         pager = request.website.pager(url=url, total=product_count, page=page, step=ppg, scope=7, url_args=post)
-        products = env['product.template'].sudo().search([('sale_ok', '=', True), ('status', '=', "approved"), ("website_published", "=", True), ("marketplace_seller_id", "=", shop_obj.sudo().seller_id.id), ("id", "in", shop_obj.sudo().seller_product_ids.ids)], limit=ppg, offset=pager['offset'], order=' website_sequence desc')
+        if search:
+            products = _get_search_domain(search)
+        else:
+            products = product_obj.sudo().browse(product_obj._get_mp_listing_ids(seller_id, website.id, shop_obj.id, listing_stamp, pager['offset'], ppg))
 
         from_currency = env['res.users'].sudo().browse(uid).company_id.currency_id
         to_currency = pricelist.currency_id
         compute_currency = lambda price: env['res.currency'].sudo()._compute(from_currency, to_currency, price)
         shop_banner_url = request.website.image_url(shop_obj, 'shop_banner')
 
-        fiscal_position = request.env['website'].get_current_website().fiscal_position_id.sudo()
-        website = request.env['website'].get_current_website()
         products_prices = lazy(lambda: products._get_sales_prices(website))
         request_args = request.httprequest.args
         attrib_list = request_args.getlist('attribute_value')
@@ -612,24 +630,23 @@ class MarketplaceSellerShop(http.Controller):
             'main_object': shop_obj, 
             'search': search,
             'rows': PPR,
-            'bins': TableCompute().process(products if not search else _get_search_domain(search), ppg, PPR),
+            'bins': TableCompute().process(products, ppg, PPR),
             'ppg': ppg,
             'ppr': PPR,
             'gap': website.shop_gap or "16px",
             'pager': pager,
-            'products': products if not search else _get_search_domain(search),
+            'products': products,
             "keep": keep,
             'selected_attributes_hash': selected_attributes_hash,
             'compute_currency': compute_currency,
             "pricelist": pricelist,
-            'hide_pager': len(_get_search_domain(search)),
+            'hide_pager': len(products) if search else product_count,
             'shop_banner_url': shop_banner_url,
             "sales_count": sales_count,
             "product_count": int(product_count),
             'get_product_prices': lambda product: lazy(lambda: products_prices[product.id]),
         }
-        website_sale_wishlist = request.env['ir.module.module'].sudo().search([('state', '=', 'installed'), ('name', '=', 'website_sale_wishlist')])
-        if website_sale_wishlist:
+        if 'product.wishlist' in request.env:
             values['products_in_wishlist'] = request.env['product.wishlist'].current().product_id.product_tmpl_id
         return request.render("odoo_marketplace.mp_seller_shop", values)
 
@@ -733,8 +750,7 @@ class MarketplaceSellerShop(http.Controller):
             'shop_obj': shop_obj,
             'get_product_prices': lambda product: lazy(lambda: products_prices[product.id]),
         }
-        website_sale_wishlist = request.env['ir.module.module'].sudo().search([('state', '=', 'installed'), ('name', '=', 'website_sale_wishlist')])
-        if website_sale_wishlist:
+        if 'product.wishlist' in request.env:
             values['products_in_wishlist'] = request.env['product.wishlist'].current().product_id.product_tmpl_id
         return request.env['ir.qweb']._render("odoo_marketplace.shop_recently_product", values, engine='ir.qweb')
 
@@ -794,16 +810,14 @@ class MarketplaceSellerShop(http.Controller):
         return {"route":route, "btn_content":btn_content }
 
     def _get_search_order(self, post):
-        # OrderBy will be parsed in orm and so no direct sql injection
-        # id is added to be sure that order is a unique sort key
-        return 'is_published desc,%s , id desc' % post.get('order', 'website_sequence desc')
+        return get_directory_order(post, SHOP_DIRECTORY_ORDERS)
 
     def _get_seller_shop_search_domain(self, search):
             """Seller shop search domain"""
             domain = [("website_published", "=", True)]
 
             if search:
-                for srch in search.split(" "):
+                for srch in search.split():
                     domain += [
                         '|', ('name', 'ilike',
                                         srch), ('description', 'ilike', srch)]
@@ -837,6 +851,7 @@ class MarketplaceSellerShop(http.Controller):
         if search:
             post["search"] = search
 
+        # The page is rendered with a fixed number of queries: count, one page search and the card values
         seller_shop_obj = request.env['seller.shop']
         seller_shop_count = seller_shop_obj.sudo().search_count(domain)
         pager = request.website.pager(url=url, total=seller_shop_count, page=page, step=ppg, scope=7, url_args=post)
@@ -846,6 +861,7 @@ class MarketplaceSellerShop(http.Controller):
             'search': search,
             'pager': pager,
             'seller_shops': seller_shops,
+            'shop_cards': seller_shops._get_shop_card_values(with_sales=request.website.mp_sale_count),
             'search_count': seller_shop_count,  # common for all searchbox
             'bins': TableCompute().process(seller_shops, ppg, PPR),
             'ppg': ppg,
@@ -946,28 +962,11 @@ class SellerReview(http.Controller):
     @http.route(['/seller/load/review/count'], type='json', auth="public", website=True)
     def load_seller_review_count(self, seller_id, offset=0, limit=False, sort_by="recent", filter_by=-1, **kwargs):
         """Load seller review count on the basis of rating"""
-        seller_obj = request.env['res.partner']
-        return_seller_review_obj = seller_obj.sudo().fetch_active_review2(
-            seller_id, int(offset), limit, sort_by, filter_by)
-        if filter_by == -1:
-            review_ids = request.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), (
-                'website_published', '=', True)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 1:
-            review_ids = request.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 1)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 2:
-            review_ids = request.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 2)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 3:
-            review_ids = request.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 3)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 4:
-            review_ids = request.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 4)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 5:
-            review_ids = request.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 5)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        return [len(return_seller_review_obj), len(review_ids)]
+        seller_obj = request.env['res.partner'].sudo().browse(seller_id)
+        star_counts = seller_obj._get_review_star_counts()
+        total_reviews = sum(star_counts.values()) if filter_by == -1 else star_counts.get(filter_by, 0)
+        remaining = max(total_reviews - int(offset), 0)
+        return [min(remaining, limit) if limit else 0, total_reviews]
 
     @http.route(['/seller/recommend'], type='json', auth="public", website=True)
     def seller_recommend(self, seller_id, recommend_state="no", **kwargs):
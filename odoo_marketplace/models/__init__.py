@@ -33,3 +33,4 @@ from . import seller_review
 from . import mail
 from . import ir_attachment
 from . import mp_pricelist_item
+from . import marketplace_revenue_report
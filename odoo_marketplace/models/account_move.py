@@ -17,6 +17,7 @@
 
 from odoo import models, fields, api, _
 from lxml import etree
+from collections import defaultdict
 import logging
 _logger = logging.getLogger(__name__)
 
@@ -32,9 +33,7 @@ class AccountMove(models.Model):
 
     def action_post(self):
         res = super().action_post()
-        for record in self:
-            if record.state == 'posted' and record.payment_state in ('paid','in_payment'):
-                record.mp_post_action_invoice_paid()
+        self.filtered(lambda record: record.state == 'posted' and record.payment_state in ('paid','in_payment')).mp_post_action_invoice_paid()
         return res
 
     @api.model
@@ -57,106 +56,114 @@ class AccountMove(models.Model):
 
     def mp_post_action_invoice_paid(self):
         self.create_seller_invoice_new()
-        for rec in self:
-            if rec.move_type in ['in_invoice', 'in_refund']:
-                seller_payment = self.env["seller.payment"].search(
-                    [("invoice_id", "=", rec.id)])
-                if seller_payment and seller_payment.payment_mode == "seller_payment" and rec.payment_state == "paid":
-                    seller_payment.write({'state': "posted"})
+        bills = self.filtered(lambda rec: rec.move_type in ['in_invoice', 'in_refund'] and rec.payment_state == "paid")
+        if bills:
+            seller_payments = self.env["seller.payment"].search([("invoice_id", "in", bills.ids)])
+            seller_payments.filtered(lambda payment: payment.payment_mode == "seller_payment").write({'state': "posted"})
 
     @api.model
-    def calculate_commission(self, list_price, seller_id):
+    def calculate_commission(self, list_price, seller_id, commission=None):
         """ Calculate seller amount and admin commission
             Return seller amount after deducting commission """
-
-        seller_obj = self.env["res.partner"].browse(seller_id)
-        commission = seller_obj.get_seller_global_fields('commission')
+        if commission is None:
+            seller_obj = self.env["res.partner"].browse(seller_id)
+            commission = seller_obj.get_seller_global_fields('commission')
         comm_factor = (list_price * (commission / 100.0))
         price_unit = list_price - comm_factor
         return price_unit
 
     def create_seller_invoice_new(self):
-        for invoice_obj in self:
-            sellers = {"seller_ids": {}}
-            if invoice_obj.move_type in ['out_invoice', 'out_refund']:
-                for invoice_line_obj in invoice_obj.invoice_line_ids:
-                    seller_id = invoice_line_obj.product_id.marketplace_seller_id.id if invoice_line_obj.product_id.marketplace_seller_id else False
-                    if seller_id:
-                        seller_amount = self.calculate_commission(invoice_line_obj.price_total, seller_id)
-                        invoice_line_obj.seller_commission = invoice_line_obj.price_total - seller_amount
-                        invoice_line_obj.update_seller_admin_amount(seller_amount)
-                        if sellers["seller_ids"].get(seller_id, False):
-                            # ADD all product
-                            sellers["seller_ids"][seller_id]["invoice_line_payment"].append(seller_amount)
-                            sellers["seller_ids"][seller_id]["invoice_line_ids"].append(invoice_line_obj.id)
-                        else:
-                            sellers["seller_ids"].update({
-                                    seller_id : {
-                                        "invoice_line_payment": [seller_amount],
-                                        "invoice_line_ids": [invoice_line_obj.id],
-                                    }
-                                }
-                            )
-                sellers.update({
-                    "invoive_type": invoice_obj.move_type,
-                    "invoice_id": invoice_obj.id,
-                    "invoice_currency": invoice_obj.currency_id,
-                    "payment_mode": "order_paid" if invoice_obj.move_type == "out_invoice" else "order_refund",
-                    "description": _("Order Invoice Payment") if invoice_obj.move_type == "out_invoice" else _("Order Invoice Refund"),
-                    "payment_type": "cr" if invoice_obj.move_type == "out_invoice" else "dr",
-                    "state": "draft",
-                    "memo": invoice_obj.invoice_origin or invoice_obj.name,
-                })
-                self.create_seller_payment_new(sellers)
+        """ Settle marketplace seller amounts of customer invoices: commission rates of all the sellers are
+            resolved once, amounts are aggregated per (invoice, seller) and the sale lines and seller payments
+            are written in batches """
+        invoices = self.filtered(lambda invoice_obj: invoice_obj.move_type in ['out_invoice', 'out_refund'])
+        invoice_lines = invoices.invoice_line_ids.filtered(lambda line: line.product_id.marketplace_seller_id)
+        if not invoice_lines:
+            return
+        commissions = invoice_lines.product_id.marketplace_seller_id.get_sellers_global_fields('commission')
+        settlements = {}
+        line_commissions = defaultdict(lambda: self.env["account.move.line"])
+        sol_amounts = defaultdict(lambda: self.env["sale.order.line"])
+        for invoice_line_obj in invoice_lines:
+            seller_id = invoice_line_obj.product_id.marketplace_seller_id.id
+            seller_amount = self.calculate_commission(invoice_line_obj.price_total, seller_id, commissions[seller_id])
+            seller_commission = invoice_line_obj.price_total - seller_amount
+            line_commissions[seller_commission] |= invoice_line_obj
+            if invoice_line_obj.sale_line_ids:
+                sol_amounts[seller_amount, seller_commission] |= invoice_line_obj.sale_line_ids[0]
+            settlement = settlements.setdefault((invoice_line_obj.move_id, seller_id), {
+                "invoice_line_payment": [],
+                "invoice_line_ids": [],
+            })
+            settlement["invoice_line_payment"].append(seller_amount)
+            settlement["invoice_line_ids"].append(invoice_line_obj.id)
+        for seller_commission, lines in line_commissions.items():
+            lines.write({'seller_commission': seller_commission})
+        for (seller_amount, seller_commission), sale_lines in sol_amounts.items():
+            sale_lines.write({
+                'seller_amount': seller_amount,
+                'admin_commission': seller_commission,
+            })
+        self.create_seller_payment_new(settlements)
 
     @api.model
-    def create_seller_payment_new(self, sellers_dict):
-        """ Create seller payment"""
-        for seller_id in list(sellers_dict.get("seller_ids")):
-            search_domain = [
+    def _prepare_seller_payment_header(self, invoice_obj):
+        """ Return the invoice dependent values of seller payments"""
+        return {
+            "invoive_type": invoice_obj.move_type,
+            "invoice_id": invoice_obj.id,
+            "invoice_currency": invoice_obj.currency_id,
+            "payment_mode": "order_paid" if invoice_obj.move_type == "out_invoice" else "order_refund",
+            "description": _("Order Invoice Payment") if invoice_obj.move_type == "out_invoice" else _("Order Invoice Refund"),
+            "payment_type": "cr" if invoice_obj.move_type == "out_invoice" else "dr",
+            "state": "draft",
+            "memo": invoice_obj.invoice_origin or invoice_obj.name,
+        }
+
+    @api.model
+    def create_seller_payment_new(self, settlements):
+        """ Create seller payments of {(invoice, seller id): {"invoice_line_payment": [...], "invoice_line_ids": [...]}}.
+            Pending order payments already created for the same memo and seller are linked to the invoice instead """
+        headers = {invoice_obj: self._prepare_seller_payment_header(invoice_obj) for invoice_obj, dummy in settlements}
+        existing_payments = {}
+        for seller_payment_obj in self.env["seller.payment"].search([
                 ("payment_type", "=", "cr"),
                 ("payment_mode", "=", "order_paid"),
-                ("memo", "=", sellers_dict.get("memo")),
-                ("seller_id", "=",  seller_id)
-            ]
-            try:
-                seller_payment_obj = self.env["seller.payment"].search(search_domain, limit=1)
-                if seller_payment_obj:
-                    seller_payment_obj.write({"invoice_id": sellers_dict.get("invoice_id")})
-                    sellers_dict["seller_ids"].pop(seller_id)
-                    seller_payment_obj.write({"state": "confirm"})
-            except Exception as e:
-                pass
-
-        if sellers_dict:
-            vals = {
-                "invoice_id": sellers_dict["invoice_id"],
-                "payment_type": sellers_dict["payment_type"],
-                "payment_mode": sellers_dict["payment_mode"],
-                "description": sellers_dict["description"],
-                "memo": sellers_dict["memo"],
-                "state": "confirm"
-            }
-            invoice_currency = sellers_dict["invoice_currency"]
-            for seller in sellers_dict["seller_ids"].keys():
-                payment_method_ids = self.env[
-                    "res.partner"].browse(seller).payment_method.ids
-                if payment_method_ids:
-                    payment_method = payment_method_ids[0]
-                else:
-                    payment_method = False
-                vals.update({"seller_id": seller})
-                vals.update({"payment_method": payment_method})
-                total_amount = 0
-                for amount in sellers_dict["seller_ids"][seller]["invoice_line_payment"]:
-                    total_amount += amount
-                mp_currency_obj = self.env["res.currency"].browse(self.env['ir.default']._get('res.config.settings', 'mp_currency_id')) or self.env.user.currency_id
-                vals.update({
-                    "invoiced_amount": total_amount,
-                    "payable_amount": invoice_currency._convert(total_amount, mp_currency_obj),
-                    "invoice_line_ids": [(6, 0,sellers_dict["seller_ids"][seller]["invoice_line_ids"])],
-                })
-                seller_payment_id = self.env['seller.payment'].create(vals)
+                ("memo", "in", list({header["memo"] for header in headers.values()})),
+                ("seller_id", "in", list({seller_id for dummy, seller_id in settlements}))]):
+            existing_payments.setdefault((seller_payment_obj.memo, seller_payment_obj.seller_id.id), seller_payment_obj)
+
+        mp_currency_obj = self.env['res.config.settings'].get_mp_global_record('mp_currency_id')
+        vals_list = []
+        new_payment_vals = {}
+        for (invoice_obj, seller), settlement in settlements.items():
+            header = headers[invoice_obj]
+            seller_payment_obj = existing_payments.get((header["memo"], seller))
+            if seller_payment_obj:
+                seller_payment_obj.write({"invoice_id": header["invoice_id"], "state": "confirm"})
+                continue
+            # Like an existing payment, an order payment created earlier in the batch for the same memo is linked to the invoice
+            if header["payment_type"] == "cr" and header["payment_mode"] == "order_paid" and (header["memo"], seller) in new_payment_vals:
+                new_payment_vals[header["memo"], seller]["invoice_id"] = header["invoice_id"]
+                continue
+            payment_method_ids = self.env["res.partner"].browse(seller).payment_method.ids
+            total_amount = sum(settlement["invoice_line_payment"])
+            vals_list.append({
+                "invoice_id": header["invoice_id"],
+                "payment_type": header["payment_type"],
+                "payment_mode": header["payment_mode"],
+                "description": header["description"],
+                "memo": header["memo"],
+                "state": "confirm",
+                "seller_id": seller,
+                "payment_method": payment_method_ids[0] if payment_method_ids else False,
+                "invoiced_amount": total_amount,
+                "payable_amount": header["invoice_currency"]._convert(total_amount, mp_currency_obj),
+                "invoice_line_ids": [(6, 0, settlement["invoice_line_ids"])],
+            })
+            if header["payment_type"] == "cr" and header["payment_mode"] == "order_paid":
+                new_payment_vals[header["memo"], seller] = vals_list[-1]
+        return self.env['seller.payment'].create(vals_list)
 
 class AccountInvoiceLine(models.Model):
     _inherit = "account.move.line"
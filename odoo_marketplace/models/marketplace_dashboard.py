@@ -15,7 +15,23 @@
 # If not, see <https://store.webkul.com/license.html/>
 #################################################################################
 
-from odoo import models, fields, api, _
+import time
+
+from odoo import models, fields, api, tools, _
+
+# Dashboard counts are cached per user for this many seconds
+DASHBOARD_CACHE_TIMEOUT = 60
+DASHBOARD_COUNT_FIELDS = ['count_product_new', 'count_product_approved', 'count_product_pending',
+    'count_product_rejected', 'count_product_cancelled', 'count_product_done']
+DASHBOARD_STATE_COUNT_FIELDS = {
+    'product': {'approved': 'count_product_approved', 'pending': 'count_product_pending', 'rejected': 'count_product_rejected'},
+    'seller': {'approved': 'count_product_approved', 'pending': 'count_product_pending', 'denied': 'count_product_rejected'},
+    'order': {'new': 'count_product_new', 'approved': 'count_product_approved', 'pending': 'count_product_pending',
+        'shipped': 'count_product_rejected', 'cancel': 'count_product_cancelled', 'done': 'count_product_done'},
+    'payment': {'draft': 'count_product_new', 'confirm': 'count_product_approved', 'requested': 'count_product_pending',
+        'canceled': 'count_product_rejected', 'posted': 'count_product_done'},
+    'stock': {'approved': 'count_product_approved', 'requested': 'count_product_pending', 'rejected': 'count_product_rejected'},
+}
 
 
 class marketplace_dashboard(models.Model):
@@ -46,189 +62,60 @@ class marketplace_dashboard(models.Model):
                     is_seller = False
             rec.is_seller = is_seller
 
-    def _get_new_count(self):
-        """ Calculate record for new state """
-        for rec in self:
-            if rec.state == 'order':
-                if rec.is_seller:
-                    user_obj = self.env['res.users'].browse(self._uid)
-                    obj = self.env['sale.order.line'].search(
-                        [('state','!=','draft'), ('marketplace_seller_id', '=',user_obj.partner_id.id), ('marketplace_state', '=', 'new')])
-                else:
-                    obj = self.env['sale.order.line'].search(
-                        [('state','!=','draft'), ('marketplace_seller_id', '!=', False), ('marketplace_state', '=', 'new')])
-                rec.count_product_new = len(obj)
-            elif rec.state == 'payment':
-                obj = self.env['seller.payment'].search(
-                    [('seller_id', '!=', False), ('state', '=', 'draft'), ('payment_mode','=','seller_payment')])
-                rec.count_product_new = len(obj)
-            else:
-                rec.count_product_new = 0
-
-    def _get_approved_count(self):
-        """ Calculate count of Approved records on dashboard"""
-        for rec in self:
-            if rec.state == 'product':
-                if rec.is_user_seller():
-                    obj = self.env['product.template'].search(
-                        [('marketplace_seller_id.user_ids', '=', self._uid), ('status', '=', 'approved')])
-                else:
-                    obj = self.env['product.template'].search(
-                        [('marketplace_seller_id', '!=', False), ('status', '=', 'approved')])
-                rec.count_product_approved = len(obj)
-            elif rec.state == 'seller':
-                obj = self.env['res.partner'].search(
-                    [('seller', '=', True), ('state', '=', 'approved')])
-                rec.count_product_approved = len(obj)
-            elif rec.state == 'order':
-                if rec.is_seller:
-                    user_obj = self.env['res.users'].browse(rec._uid)
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('marketplace_state', '=', 'approved'),('state', 'not in', ('draft', 'sent'))])
-                else:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '!=', False), ('marketplace_state', '=', 'approved'),('state', 'not in', ('draft', 'sent'))])
-                rec.count_product_approved = len(obj)
-            elif rec.state == 'payment':
-                obj = self.env['seller.payment'].search(
-                    [('seller_id', '!=', False), ('state', '=', 'confirm'), ('payment_mode','=','seller_payment')])
-                rec.count_product_approved = len(obj)
-            elif rec.state == 'stock':
-                if rec.is_seller:
-                    user_obj = self.env['res.users'].browse(rec._uid)
-                    obj = self.env['marketplace.stock'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('state', '=', 'approved')])
-                else:
-                    obj = self.env['marketplace.stock'].search(
-                        [("marketplace_seller_id","!=",False), ('state', '=', 'approved')])
-                rec.count_product_approved = len(obj)
-            else:
-                rec.count_product_approved = 0
-
-    def _get_pending_count(self):
-        """ Calculate count of pending records on dashboard"""
-        for rec in self:
-            if rec.state == 'product':
-                if rec.is_user_seller():
-                    obj = self.env['product.template'].search(
-                        [('marketplace_seller_id.user_ids', '=', rec._uid), ('status', '=', 'pending')])
-                else:
-                    obj = self.env['product.template'].search(
-                        [('marketplace_seller_id', '!=', False), ('status', '=', 'pending')])
-                rec.count_product_pending = len(obj)
-            elif rec.state == 'seller':
-                obj = self.env['res.partner'].search(
-                    [('seller', '=', True), ('state', '=', 'pending')])
-                rec.count_product_pending = len(obj)
-            elif rec.state == 'order':
-                user_obj = self.env['res.users'].browse(rec._uid)
-                if rec.is_seller:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('marketplace_state', '=', 'pending'),('state', 'not in', ('draft', 'sent'))])
-                else:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '!=', False), ('marketplace_state', '=', 'pending'),('state', 'not in', ('draft', 'sent'))])
-                rec.count_product_pending = len(obj)
-            elif rec.state == 'payment':
-                obj = self.env['seller.payment'].search(
-                    [('seller_id', '!=', False), ('state', '=', 'requested'), ('payment_mode','=','seller_payment')])
-                rec.count_product_pending = len(obj)
-            elif rec.state == 'stock':
-                if rec.is_seller:
-                    user_obj = self.env['res.users'].browse(rec._uid)
-                    obj = self.env['marketplace.stock'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('state', '=', 'requested')])
-                else:
-                    obj = self.env['marketplace.stock'].search(
-                        [("marketplace_seller_id","!=",False), ('state', '=', 'requested')])
-                rec.count_product_pending = len(obj)
-            else:
-                rec.count_product_pending = 0
-
-    def _get_rejected_count(self):
-        """ Calculate count of rejected records on dashboard"""
-        for rec in self:
-            if rec.state == 'product':
-                if rec.is_user_seller():
-                    obj = self.env['product.template'].search(
-                        [('marketplace_seller_id.user_ids', '=', rec._uid), ('status', '=', 'rejected')])
-                else:
-                    obj = self.env['product.template'].search(
-                        [('marketplace_seller_id', '!=', False), ('status', '=', 'rejected')])
-                rec.count_product_rejected = len(obj)
-            elif rec.state == 'seller':
-                obj = self.env['res.partner'].search(
-                    [('seller', '=', True), ('state', '=', 'denied')])
-                rec.count_product_rejected = len(obj)
-            elif rec.state == 'order':
-                user_obj = self.env['res.users'].browse(rec._uid)
-                if rec.is_seller:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('marketplace_state', '=', 'shipped'),('state', 'not in', ('draft', 'sent'))])
-                else:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '!=', False), ('marketplace_state', '=', 'shipped'),('state', 'not in', ('draft', 'sent'))])
-                rec.count_product_rejected = len(obj)
-            elif rec.state == 'payment':
-                obj = self.env['seller.payment'].search(
-                    [('seller_id', '!=', False), ('state', '=', 'canceled'), ('payment_mode','=','seller_payment') ])
-                rec.count_product_rejected = len(obj)
-            elif rec.state == 'stock':
-                if rec.is_seller:
-                    user_obj = self.env['res.users'].browse(rec._uid)
-                    obj = self.env['marketplace.stock'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('state', '=', 'rejected')])
-                else:
-                    obj = self.env['marketplace.stock'].search(
-                        [("marketplace_seller_id","!=",False), ('state', '=', 'rejected')])
-                rec.count_product_rejected = len(obj)
-            else:
-                rec.count_product_rejected = 0
+    def _get_dashboard_count_domain(self, state, is_seller):
+        """ Return model, domain and group by fields of the records counted on the tiles of a dashboard state """
+        if is_seller:
+            seller_domain = [('marketplace_seller_id', '=', self.env.user.partner_id.id)]
+        else:
+            seller_domain = [('marketplace_seller_id', '!=', False)]
+        if state == 'product':
+            if self.is_user_seller():
+                return 'product.template', [('marketplace_seller_id.user_ids', '=', self._uid)], ['status']
+            return 'product.template', [('marketplace_seller_id', '!=', False)], ['status']
+        if state == 'seller':
+            return 'res.partner', [('seller', '=', True)], ['state']
+        if state == 'order':
+            return 'sale.order.line', seller_domain + [('state', '!=', 'draft')], ['marketplace_state', 'state']
+        if state == 'payment':
+            return 'seller.payment', [('seller_id', '!=', False), ('payment_mode', '=', 'seller_payment')], ['state']
+        if state == 'stock':
+            return 'marketplace.stock', seller_domain, ['state']
+        return False, [], []
 
+    @api.model
+    @tools.ormcache('self.env.uid', 'tuple(self.env.companies.ids)', 'state', 'is_seller', 'cache_slot')
+    def _get_dashboard_counts(self, state, is_seller, cache_slot):
+        """ Count the records of all the tiles of a dashboard state with a single grouped query.
+            cache_slot changes every DASHBOARD_CACHE_TIMEOUT seconds, so counts are cached per user for that time. """
+        counts = dict.fromkeys(DASHBOARD_COUNT_FIELDS, 0)
+        model, domain, groupby = self._get_dashboard_count_domain(state, is_seller)
+        if not model:
+            return counts
+        state_count_fields = DASHBOARD_STATE_COUNT_FIELDS[state]
+        for *group_values, count in self.env[model]._read_group(domain, groupby, ['__count']):
+            count_field = state_count_fields.get(group_values[0])
+            # Only the new order tile counts the lines of quotations sent to customer
+            if not count_field or (state == 'order' and group_values[1] == 'sent' and count_field != 'count_product_new'):
+                continue
+            counts[count_field] += count
+        return counts
 
-    def _get_cancelled_count(self):
-        """ Calculate count of cancelled records on dashboard"""
+    def _compute_dashboard_counts(self):
+        """ Calculate count of records of each state on dashboard """
+        cache_slot = int(time.time() // DASHBOARD_CACHE_TIMEOUT)
         for rec in self:
-            if rec.state == 'order':
-                user_obj = self.env['res.users'].browse(rec._uid)
-                if rec.is_seller:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('marketplace_state', '=', 'cancel'),('state', 'not in', ('draft', 'sent'))])
-                else:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '!=', False), ('marketplace_state', '=', 'cancel'),('state', 'not in', ('draft', 'sent'))])
-                rec.count_product_cancelled = len(obj)
-            else:
-                rec.count_product_cancelled = 0
-
-    def _get_done_count(self):
-        """ Calculate count of done records on dashboard"""
-        for rec in self:
-            if rec.state == 'order':
-                if rec.is_seller:
-                    user_obj = self.env['res.users'].browse(rec._uid)
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '=',user_obj.partner_id.id), ('marketplace_state', '=', 'done'),('state', 'not in', ('draft', 'sent'))])
-                else:
-                    obj = self.env['sale.order.line'].search(
-                        [('marketplace_seller_id', '!=', False), ('marketplace_state', '=', 'done'),('state', 'not in', ('draft', 'sent'))])
-                rec.count_product_done = len(obj)
-            elif rec.state == 'payment':
-                obj = self.env['seller.payment'].search(
-                    [('seller_id', '!=', False), ('state', '=', 'posted'), ('payment_mode','=','seller_payment')])
-                rec.count_product_done = len(obj)
-            else:
-                rec.count_product_done = 0
-
+            counts = self._get_dashboard_counts(rec.state, rec.is_seller, cache_slot)
+            for count_field in DASHBOARD_COUNT_FIELDS:
+                rec[count_field] = counts[count_field]
 
-    count_product_done = fields.Integer(compute='_get_done_count')
+    count_product_done = fields.Integer(compute='_compute_dashboard_counts')
     color = fields.Integer(string='Color Index')
     name = fields.Char(string="Name", translate=True)
     state = fields.Selection(
         [('product', 'Product'), ('seller', 'Seller'), ('order', 'Order'), ('payment', 'Payment'),('stock', 'Stock')])
-    count_product_new = fields.Integer(compute='_get_new_count')
-    count_product_approved = fields.Integer(compute='_get_approved_count')
-    count_product_pending = fields.Integer(compute='_get_pending_count')
-    count_product_rejected = fields.Integer(compute='_get_rejected_count')
-    count_product_cancelled = fields.Integer(compute='_get_cancelled_count')
+    count_product_new = fields.Integer(compute='_compute_dashboard_counts')
+    count_product_approved = fields.Integer(compute='_compute_dashboard_counts')
+    count_product_pending = fields.Integer(compute='_compute_dashboard_counts')
+    count_product_rejected = fields.Integer(compute='_compute_dashboard_counts')
+    count_product_cancelled = fields.Integer(compute='_compute_dashboard_counts')
     is_seller = fields.Boolean(compute="_is_seller_or_manager")
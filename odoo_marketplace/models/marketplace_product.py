@@ -15,11 +15,15 @@
 # If not, see <https://store.webkul.com/license.html/>
 #################################################################################
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError, ValidationError
 import logging
 _logger = logging.getLogger(__name__)
 
+# product fields deciding which products are listed on seller profile/shop pages and in which order
+MP_LISTING_FIELDS = {'sale_ok', 'status', 'is_published', 'marketplace_seller_id', 'website_id', 'website_sequence', 'active', 'company_id'}
+
+
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
 
@@ -117,7 +121,9 @@ class ProductTemplate(models.Model):
                 mp_categ = self.env['res.config.settings'].get_mp_global_field_value('internal_categ')
                 if mp_categ:
                     vals["categ_id"] = mp_categ
-        return super(ProductTemplate, self).create(vals_list)
+        res = super(ProductTemplate, self).create(vals_list)
+        res._touch_mp_listing_stamp()
+        return res
 
     # Action methods
 
@@ -289,19 +295,17 @@ class ProductTemplate(models.Model):
                 product_obj.check_state_send_mail()
 
     def update_quantity(self):
-        for product in self:
-            product_stock = self.env['marketplace.stock'].search([('product_temp_id','=',product.id),('state','=','requested')])
-            if product_stock:
-                raise ValidationError(_('Your inventory request is already in a pending state.'))
-            else:
-                return {
-                    'name': _("Marketplace Stock"),
-                    'type': 'ir.actions.act_window',
-                    'res_model': 'marketplace.stock',
-                    'view_mode': 'form',
-                    'view_type': 'form',
-                    'target': 'new',
-                }
+        if self and self.env['marketplace.stock'].search_count([('product_temp_id','in',self.ids),('state','=','requested')], limit=1):
+            raise ValidationError(_('Your inventory request is already in a pending state.'))
+        if self:
+            return {
+                'name': _("Marketplace Stock"),
+                'type': 'ir.actions.act_window',
+                'res_model': 'marketplace.stock',
+                'view_mode': 'form',
+                'view_type': 'form',
+                'target': 'new',
+            }
 
     # Called in server action
     def approve_product(self):
@@ -368,7 +372,56 @@ class ProductTemplate(models.Model):
             for rec in self:
                 if rec.marketplace_seller_id and rec.status not in ["draft", "pending"]:
                     raise UserError(_('You cannot change the seller of the product that already contains seller.'))
-        return super(ProductTemplate, self).write(vals)
+        if not MP_LISTING_FIELDS.intersection(vals):
+            return super(ProductTemplate, self).write(vals)
+        seller_ids = self.sudo().marketplace_seller_id.ids
+        res = super(ProductTemplate, self).write(vals)
+        self._touch_mp_listing_stamp(seller_ids)
+        return res
+
+    def unlink(self):
+        seller_ids = self.sudo().marketplace_seller_id.ids
+        res = super(ProductTemplate, self).unlink()
+        self._touch_mp_listing_stamp(seller_ids)
+        return res
+
+    def _touch_mp_listing_stamp(self, seller_ids=None):
+        """ Renew the listing stamp of the sellers of the products, their cached listings are not used any more"""
+        seller_ids = set(seller_ids or []) | set(self.sudo().exists().marketplace_seller_id.ids)
+        if not seller_ids:
+            return
+        self.env.cr.execute("UPDATE res_partner SET mp_listing_stamp = clock_timestamp() WHERE id IN %s", [tuple(seller_ids)])
+        self.env['res.partner'].browse(seller_ids).invalidate_recordset(['mp_listing_stamp'])
+
+    @api.model
+    def _get_mp_listing_domain(self, seller_id, website_id, shop_id=False):
+        """ Return domain of the products listed on a seller profile or seller shop page"""
+        domain = [('sale_ok', '=', True), ('status', '=', "approved"), ("is_published", "=", True), ("marketplace_seller_id", "=", seller_id)]
+        domain += self.env['website'].browse(website_id).website_domain()
+        if shop_id:
+            domain.append(("id", "in", self.env['seller.shop'].sudo().browse(shop_id).seller_product_ids.ids))
+        return domain
+
+    @api.model
+    def _get_mp_listing_stamp(self, seller_id, shop_id=False):
+        """ Return a value that changes whenever a listed product of the seller or the shop changes, used in the key of
+            the listing cache so that it never needs to be cleared, the listing does not depend on the pricelist"""
+        seller_stamp = self.env['res.partner'].sudo().browse(seller_id).mp_listing_stamp
+        shop_write_date = self.env['seller.shop'].sudo().browse(shop_id).write_date if shop_id else False
+        return (seller_stamp, shop_write_date)
+
+    @api.model
+    @tools.ormcache('seller_id', 'website_id', 'shop_id', 'stamp')
+    def _get_mp_listing_count(self, seller_id, website_id, shop_id, stamp):
+        """ Return cached count of the products listed on a seller profile or seller shop page"""
+        return self.sudo().search_count(self._get_mp_listing_domain(seller_id, website_id, shop_id))
+
+    @api.model
+    @tools.ormcache('seller_id', 'website_id', 'shop_id', 'stamp', 'offset', 'limit')
+    def _get_mp_listing_ids(self, seller_id, website_id, shop_id, stamp, offset, limit):
+        """ Return cached product ids of one seller profile or seller shop page"""
+        return tuple(self.sudo().search(self._get_mp_listing_domain(seller_id, website_id, shop_id),
+            offset=offset, limit=limit, order='website_sequence desc, id').ids)
 
     def _get_combination_info(self, combination=False, product_id=False, add_qty=1, parent_combination=False, only_template=False):
         combination_info = super(ProductTemplate, self)._get_combination_info(
@@ -506,19 +559,17 @@ class ProductProduct(models.Model):
         }
 
     def product_update_quantity(self):
-        for product in self:
-            product_stock = self.env['marketplace.stock'].search([('product_id','=',product.id),('state','=','requested')])
-            if product_stock:
-                raise ValidationError(_('Your inventory request is already in a pending state.'))
-            else:
-                return {
-                    'name': _("Marketplace Stock"),
-                    'type': 'ir.actions.act_window',
-                    'res_model': 'marketplace.stock',
-                    'view_mode': 'form',
-                    'view_type': 'form',
-                    'target': 'new',
-                }
+        if self and self.env['marketplace.stock'].search_count([('product_id','in',self.ids),('state','=','requested')], limit=1):
+            raise ValidationError(_('Your inventory request is already in a pending state.'))
+        if self:
+            return {
+                'name': _("Marketplace Stock"),
+                'type': 'ir.actions.act_window',
+                'res_model': 'marketplace.stock',
+                'view_mode': 'form',
+                'view_type': 'form',
+                'target': 'new',
+            }
 
     def _check_record_mp_access(self, user):
         '''
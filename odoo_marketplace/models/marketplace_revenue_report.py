@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#################################################################################
+# Author      : Webkul Software Pvt. Ltd. (<https://webkul.com/>)
+# Copyright(c): 2015-Present Webkul Software Pvt. Ltd.
+# License URL : https://store.webkul.com/license.html/
+# All Rights Reserved.
+#
+#
+#
+# This program is copyright property of the author mentioned above.
+# You can`t redistribute it and/or modify it.
+#
+#
+# You should have received a copy of the License along with this program.
+# If not, see <https://store.webkul.com/license.html/>
+#################################################################################
+
+from odoo import models, fields, tools
+from odoo.addons.odoo_marketplace.models.sale import SaleOrderLine
+
+
+class MarketplaceRevenueReport(models.Model):
+    _name = "marketplace.revenue.report"
+    _description = "Marketplace Revenue Analysis"
+    _auto = False
+    _rec_name = 'order_id'
+    _order = 'date desc'
+
+    date = fields.Datetime(string="Order Date", readonly=True)
+    order_id = fields.Many2one("sale.order", string="Order", readonly=True)
+    partner_id = fields.Many2one("res.partner", string="Customer", readonly=True)
+    seller_id = fields.Many2one("res.partner", string="Seller", readonly=True)
+    product_id = fields.Many2one("product.product", string="Product", readonly=True)
+    company_id = fields.Many2one("res.company", string="Company", readonly=True)
+    currency_id = fields.Many2one("res.currency", string="Currency", readonly=True)
+    marketplace_state = fields.Selection(SaleOrderLine.STATES, string="Marketplace State", readonly=True)
+    product_uom_qty = fields.Float(string="Quantity", readonly=True)
+    price_total = fields.Float(string="Total", readonly=True)
+    seller_amount = fields.Float(string="Seller Amount", readonly=True)
+    admin_commission = fields.Float(string="Admin Commission", readonly=True)
+
+    def _query(self):
+        """ One row per confirmed order line of a marketplace seller product """
+        return """
+            SELECT
+                l.id AS id,
+                s.date_order AS date,
+                l.order_id AS order_id,
+                s.partner_id AS partner_id,
+                l.marketplace_seller_id AS seller_id,
+                l.product_id AS product_id,
+                l.company_id AS company_id,
+                l.currency_id AS currency_id,
+                l.marketplace_state AS marketplace_state,
+                l.product_uom_qty AS product_uom_qty,
+                l.price_total AS price_total,
+                l.seller_amount AS seller_amount,
+                l.admin_commission AS admin_commission
+            FROM sale_order_line l
+            JOIN sale_order s ON s.id = l.order_id
+            WHERE l.marketplace_seller_id IS NOT NULL
+              AND s.state = 'sale'
+        """
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""CREATE OR REPLACE VIEW %s AS (%s)""" % (self._table, self._query()))
+
+    def _get_seller_commissions(self, domain=None, period='month'):
+        """ Return [(seller, period, admin commission, seller amount)] in a single grouped query """
+        return self._read_group(domain or [], ['seller_id', 'date:%s' % period],
+                                ['admin_commission:sum', 'seller_amount:sum'])
@@ -16,9 +16,11 @@
 #################################################################################
 
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
+from odoo.tools import frozendict
 from odoo.tools.translate import _
 from odoo.exceptions import UserError
+import json
 import logging
 _logger = logging.getLogger(__name__)
 
@@ -101,6 +103,7 @@ class ResConfigSettings(models.TransientModel):
         "mail.template", string="Mail Template to Notify Seller On Product Approve/Reject", domain="[('model_id.model','=','product.template')]")
     notify_seller_on_new_order_m_tmpl_id = fields.Many2one(
         "mail.template", string="Mail Template to Notify Seller On New Order Confirm", domain="[('model_id.model','=','sale.order')]")
+    notify_seller_on_new_order_digest = fields.Boolean(string="Group New Order Notifications Per Seller", help="Send one mail per seller gathering all orders confirmed together instead of one mail per order.")
     
     notify_admin_on_no_qty = fields.Many2one(
         "mail.template", string="Mail Template to Notify Seller on low sale order", domain="[('model_id.model','=','sale.order.line')]")
@@ -201,6 +204,7 @@ class ResConfigSettings(models.TransientModel):
         self.env['ir.default'].sudo().set('res.config.settings', 'notify_admin_on_product_approve_reject_m_tmpl_id', self.notify_admin_on_product_approve_reject_m_tmpl_id.id)
         self.env['ir.default'].sudo().set('res.config.settings', 'notify_seller_on_product_approve_reject_m_tmpl_id', self.notify_seller_on_product_approve_reject_m_tmpl_id.id)
         self.env['ir.default'].sudo().set('res.config.settings', 'notify_seller_on_new_order_m_tmpl_id', self.notify_seller_on_new_order_m_tmpl_id.id)
+        self.env['ir.default'].sudo().set('res.config.settings', 'notify_seller_on_new_order_digest', self.notify_seller_on_new_order_digest)
         self.env['ir.default'].sudo().set('res.config.settings', 'seller_payment_journal_id', self.seller_payment_journal_id.id, company_id=True)
         seller_payment = self.env["seller.payment"].sudo().search([]) #For users who are not from marketplace group
         if not seller_payment:
@@ -238,6 +242,7 @@ class ResConfigSettings(models.TransientModel):
         notify_admin_on_product_approve_reject_m_tmpl_id = self.env['ir.default']._get('res.config.settings', 'notify_admin_on_product_approve_reject_m_tmpl_id')
         notify_seller_on_product_approve_reject_m_tmpl_id = self.env['ir.default']._get('res.config.settings', 'notify_seller_on_product_approve_reject_m_tmpl_id')
         notify_seller_on_new_order_m_tmpl_id = self.env['ir.default']._get('res.config.settings', 'notify_seller_on_new_order_m_tmpl_id')
+        notify_seller_on_new_order_digest = self.env['ir.default']._get('res.config.settings', 'notify_seller_on_new_order_digest')
         seller_payment_journal_id = self.env['ir.default']._get('res.config.settings', 'seller_payment_journal_id', company_id=True) or self.get_journal_id().id
         mp_currency_id = self.env['ir.default']._get('res.config.settings', 'mp_currency_id') or self.env.user.company_id.currency_id.id
         show_visit_shop = self.env['ir.default']._get('res.config.settings', 'show_visit_shop')
@@ -277,6 +282,7 @@ class ResConfigSettings(models.TransientModel):
             notify_admin_on_product_approve_reject_m_tmpl_id = notify_admin_on_product_approve_reject_m_tmpl_id,
             notify_seller_on_product_approve_reject_m_tmpl_id = notify_seller_on_product_approve_reject_m_tmpl_id,
             notify_seller_on_new_order_m_tmpl_id = notify_seller_on_new_order_m_tmpl_id,
+            notify_seller_on_new_order_digest = notify_seller_on_new_order_digest,
             seller_payment_journal_id  = seller_payment_journal_id,
             mp_currency_id  = mp_currency_id,
             show_visit_shop = show_visit_shop,
@@ -292,23 +298,40 @@ class ResConfigSettings(models.TransientModel):
         """ Return fields name """
         return ['mp_location_id', 'mp_warehouse_id', 'seller_payment_journal_id']
 
+    @api.model
+    @tools.ormcache('self.env.company.id')
+    def _get_mp_global_settings(self):
+        """ Return {field name: value} of the marketplace settings of the current company, read once per company
+            and kept in the registry cache, which ir.default clears whenever the settings are saved """
+        company_fields = self.get_mp_company_dependent_fields()
+        defaults = self.env['ir.default'].sudo().search([
+            ('field_id.model', '=', 'res.config.settings'),
+            ('user_id', '=', False),
+            ('condition', '=', False),
+            ('company_id', 'in', [False, self.env.company.id]),
+        ])
+        settings = {}
+        for default in defaults:
+            field_name = default.field_id.name
+            if bool(default.company_id) == (field_name in company_fields):
+                settings[field_name] = json.loads(default.json_value)
+        if not settings.get('internal_categ'):
+            settings['internal_categ'] = self.sudo()._default_category().id
+        if not settings.get('mp_location_id'):
+            settings['mp_location_id'] = self._default_location().id
+        if not settings.get('seller_payment_journal_id'):
+            settings['seller_payment_journal_id'] = self.get_journal_id().id
+        if not settings.get('mp_currency_id'):
+            settings['mp_currency_id'] = self.env.company.currency_id.id
+        return frozendict(settings)
+
     def get_mp_global_field_value(self, default_key):
         """ Return field's data/value """
+        return self._get_mp_global_settings().get(default_key)
 
-        company = False
-        company_fields = self.get_mp_company_dependent_fields()
-        if default_key in company_fields:
-            company = True
-        field_value = self.env['ir.default']._get('res.config.settings', default_key, company_id=company)
-        if default_key == 'internal_categ' and not field_value:
-            field_value = self._default_category().id
-        if default_key == 'mp_location_id' and not field_value:
-            field_value = self._default_location().id
-        if default_key == 'seller_payment_journal_id' and not field_value:
-            field_value = self.get_journal_id().id
-        if default_key == 'mp_currency_id' and not field_value:
-            field_value = self.env.user.company_id.currency_id.id
-        return field_value
+    def get_mp_global_record(self, default_key):
+        """ Return field's value as a record of the field's comodel """
+        return self.env[self._fields[default_key].comodel_name].browse(self.get_mp_global_field_value(default_key))
 
     def execute(self):
         self.ensure_one()
@@ -15,9 +15,12 @@
 # If not, see <https://store.webkul.com/license.html/>
 #################################################################################
 
-from odoo import SUPERUSER_ID, models, fields, api, _
+from odoo import SUPERUSER_ID, models, fields, api, tools, _
 from odoo.exceptions import MissingError, ValidationError
-import decimal,re
+import re
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from odoo.tools import float_round
 from odoo.exceptions import UserError
 import logging
 _logger = logging.getLogger(__name__)
@@ -70,6 +73,12 @@ class ResPartner(models.Model):
         min_sequence = self._cr.fetchone()[0]
         return min_sequence and min_sequence - 1 or 10
 
+    def init(self):
+        """ Trigram index on the name of sellers, used by the ilike search of the seller directory """
+        if self.env.registry.has_trigram:
+            tools.create_index(self.env.cr, 'res_partner_mp_seller_name_trgm_index', self._table,
+                               ['name gin_trgm_ops'], method='gin', where='seller = true')
+
     # marketplace related field declaration
     allow_min_qty_notification=fields.Boolean(string="Activate Inventory Notification")
     set_min_qty=fields.Float(string="Threshold Qty.")
@@ -79,6 +88,7 @@ class ResPartner(models.Model):
                                       help="It's you're accepted payment method, which will be used by admin during sending the payment.", default=_set_payment_method)
     state = fields.Selection([('new', 'New'), ('pending', 'Pending for Approval'), ('approved', 'Approved'), (
         'denied', 'Denied')], string="Seller Status", default="new", copy=False, tracking=True)
+    mp_listing_stamp = fields.Datetime(string="Listing Stamp", readonly=True, copy=False, help="Last change of the products listed on the seller pages.")
     attachment_ids = fields.One2many('ir.attachment', 'res_id', domain=lambda self: [
                                      ('res_model', '=', self._name)], auto_join=True, string='Attachments')
     displayed_image_id = fields.Many2one(
@@ -100,23 +110,30 @@ class ResPartner(models.Model):
         'res.config.settings', 'mp_next_payment_request'), copy=False, tracking=True)
     auto_approve_qty = fields.Boolean(string="Auto Quantity Approve", default=lambda self: self.env[
                                       'ir.default']._get('res.config.settings', 'mp_auto_approve_qty'), copy=False)
+    seller_payment_ids = fields.One2many("seller.payment", "seller_id", string="Seller Payments")
     total_mp_payment = fields.Monetary(
-        string="Total Amount", compute="_calculate_mp_related_payment", currency_field='seller_currency_id')
-    paid_mp_payment = fields.Monetary(string="Paid Amount", compute="_calculate_mp_related_payment", currency_field='seller_currency_id')
-    balance_mp_payment = fields.Monetary(string="Balance Amount", compute="_calculate_mp_related_payment", currency_field='seller_currency_id')
-    available_amount = fields.Monetary(string="Avalibale Amount", compute="_calculate_mp_related_payment", currency_field='seller_currency_id')
-    cashable_amount = fields.Monetary(string="Cashable Amount", compute="_calculate_mp_related_payment", currency_field='seller_currency_id')
+        string="Total Amount", compute="_calculate_mp_related_payment", store=True, currency_field='seller_currency_id')
+    paid_mp_payment = fields.Monetary(string="Paid Amount", compute="_calculate_mp_related_payment", store=True, currency_field='seller_currency_id')
+    balance_mp_payment = fields.Monetary(string="Balance Amount", compute="_calculate_mp_related_payment", store=True, currency_field='seller_currency_id')
+    available_amount = fields.Monetary(string="Avalibale Amount", compute="_calculate_mp_related_payment", store=True, currency_field='seller_currency_id')
+    cashable_amount = fields.Monetary(string="Cashable Amount", compute="_calculate_mp_related_payment", store=True, currency_field='seller_currency_id')
     seller_currency_id = fields.Many2one('res.currency', compute='_get_seller_currency', string="Marketplace Currency", readonly=True)
     return_policy = fields.Html(string="Return Policy", default="Seller return policy is not defined.", copy=False, translate=True)
     shipping_policy = fields.Html(string="Shipping policy", default="Seller shipping policy is not defined.", copy=False, translate=True)
     profile_msg = fields.Html(string="Profile Message", copy=False, translate=True)
     profile_image = fields.Binary(string="Profile Image", copy=False)
     profile_banner = fields.Binary(string="Profile Banner", copy=False)
+    profile_image_256 = fields.Image(related="profile_image", max_width=256, max_height=256, store=True, string="Profile Image 256")
+    profile_banner_1024 = fields.Image(related="profile_banner", max_width=1024, max_height=1024, store=True, string="Profile Banner 1024")
     # seller reviews fields
     seller_review_ids = fields.One2many(
         'seller.review', 'marketplace_seller_id', string='Review')
     average_rating = fields.Float(
-        compute='_set_avg_rating', string="Average Rating")
+        compute='_set_avg_rating', string="Average Rating", store=True)
+    published_review_count = fields.Integer(
+        compute='_set_avg_rating', string="Published Reviews", store=True)
+    published_average_rating = fields.Float(
+        compute='_set_avg_rating', string="Published Average Rating", store=True)
     active_recommendation = fields.Float(
     compute='_set_active_recommendation', string="Recommend")
 
@@ -267,46 +284,44 @@ class ResPartner(models.Model):
 
     def _get_seller_currency(self):
         """ Compute seller currency"""
+        mp_currency_obj = self.env['res.config.settings'].get_mp_global_record('mp_currency_id')
         for obj in self:
-            obj.seller_currency_id = self.env['ir.default']._get('res.config.settings', 'mp_currency_id') or self.env.user.company_id.currency_id
+            obj.seller_currency_id = mp_currency_obj
 
     def _get_website_ribbon(self):
         return self.website_ribbon_id
 
+    @api.depends("seller", "seller_payment_ids.state", "seller_payment_ids.payment_mode",
+        "seller_payment_ids.payable_amount", "seller_payment_ids.is_cashable")
     def _calculate_mp_related_payment(self):
-        """ Calculate total_mp_payment,balance_mp_payment,cashable_amount,paid_mp_payment ,total_mp_payment for seller"""
+        """ Calculate total_mp_payment,balance_mp_payment,cashable_amount,paid_mp_payment ,total_mp_payment for seller.
+            Totals are stored and maintained on payment changes, they are rebuilt with one grouped query for all sellers."""
+        balances = self._get_mp_payment_balances()
         for obj in self:
-            if obj.seller:
-                total_mp_payment = paid_mp_payment = cashable_amount = 0
-                seller_payment_objs = self.env["seller.payment"].search([("seller_id", "=", obj.id), ("state", "not in",["draft", "requested"])])
-                for seller_payment in seller_payment_objs:
-                    #Calculate total marketplace payment for seller
-                    if seller_payment.state == 'confirm' and seller_payment.payment_mode == "order_paid":
-                        total_mp_payment += abs(seller_payment.payable_amount)
-
-                    #Calculate total paid marketplace payment for seller
-                    if seller_payment.state == 'posted' and seller_payment.payment_mode == "seller_payment":
-                        paid_mp_payment += abs(seller_payment.payable_amount)
-
-                    #Calculate marketplace cashable payment for seller
-                    if seller_payment.state == 'confirm' and seller_payment.payment_mode == "order_paid" and seller_payment.is_cashable:
-                        cashable_amount += abs(seller_payment.payable_amount)
-
-                obj.total_mp_payment = total_mp_payment
-                obj.paid_mp_payment = paid_mp_payment
-                obj.cashable_amount = (round(decimal.Decimal(cashable_amount - obj.paid_mp_payment), 2))
-
-                #Calculate total balanec marketplace payment for seller
-                obj.balance_mp_payment = abs(obj.total_mp_payment) - abs(obj.paid_mp_payment)
-
-                #Calculate marketplace available payment for seller
-                obj.available_amount = (round(decimal.Decimal(obj.balance_mp_payment), 2))
-            else:
-                obj.total_mp_payment = 0
-                obj.paid_mp_payment = 0
-                obj.cashable_amount = 0
-                obj.balance_mp_payment = 0
-                obj.available_amount = 0
+            total_mp_payment, paid_mp_payment, cashable_amount = balances.get(obj.id, (0.0, 0.0, 0.0)) if obj.seller else (0.0, 0.0, 0.0)
+            obj.total_mp_payment = total_mp_payment
+            obj.paid_mp_payment = paid_mp_payment
+            obj.cashable_amount = round(cashable_amount - paid_mp_payment, 2) if obj.seller else 0
+            #Calculate total balanec marketplace payment for seller
+            obj.balance_mp_payment = abs(total_mp_payment) - abs(paid_mp_payment)
+            #Calculate marketplace available payment for seller
+            obj.available_amount = round(obj.balance_mp_payment, 2)
+
+    def _get_mp_payment_balances(self):
+        """ Return {seller id: (total amount, paid amount, cashable amount)} of sellers in self """
+        seller_ids = [seller_id for seller_id in self.filtered("seller").ids if seller_id]
+        if not seller_ids:
+            return {}
+        self.env["seller.payment"].flush_model(["seller_id", "state", "payment_mode", "payable_amount", "is_cashable"])
+        self.env.cr.execute("""
+            SELECT seller_id,
+                COALESCE(SUM(ABS(payable_amount)) FILTER (WHERE state = 'confirm' AND payment_mode = 'order_paid'), 0),
+                COALESCE(SUM(ABS(payable_amount)) FILTER (WHERE state = 'posted' AND payment_mode = 'seller_payment'), 0),
+                COALESCE(SUM(ABS(payable_amount)) FILTER (WHERE state = 'confirm' AND payment_mode = 'order_paid' AND is_cashable), 0)
+            FROM seller_payment
+            WHERE seller_id IN %s AND state NOT IN ('draft', 'requested')
+            GROUP BY seller_id""", (tuple(seller_ids),))
+        return {row[0]: row[1:] for row in self.env.cr.fetchall()}
 
     def _compute_sol_count(self):
         """ Calculate sale order line count for seller"""
@@ -493,6 +508,19 @@ class ResPartner(models.Model):
             field_value = self.env['res.config.settings'].get_mp_global_field_value(field_key)
         return field_value
 
+    def get_sellers_global_fields(self, field_name):
+        """ Return {seller id: global setting field's value} of the sellers, the global value is resolved once"""
+        global_value = None
+        values = {}
+        for seller in self:
+            if seller.set_seller_wise_settings:
+                values[seller.id] = seller.get_seller_global_fields(field_name)
+            else:
+                if global_value is None:
+                    global_value = self.env['res.config.settings'].get_mp_global_field_value('mp_%s' % field_name)
+                values[seller.id] = global_value
+        return values
+
     # Action methods
 
     def approve(self):
@@ -699,16 +727,21 @@ class ResPartner(models.Model):
         return True
 
     # Methods used in seller review process
+    @api.depends('seller_review_ids.rating', 'seller_review_ids.is_published', 'seller_review_ids.active')
     def _set_avg_rating(self):
-        """ Calculating seller average ratings """
-        add = 0.0
-        avg = 0.0
+        """ Calculating seller average ratings and published review counts with one grouped query """
+        stats = {}
+        if self.ids:
+            for seller, is_published, rating_sum, count in self.env["seller.review"].sudo()._read_group(
+                    [('marketplace_seller_id', 'in', self.ids)], ['marketplace_seller_id', 'is_published'], ['rating:sum', '__count']):
+                stats[seller.id, is_published] = (rating_sum, count)
         for obj in self:
-            if obj.seller_review_ids:
-                for reviews_obj in obj.seller_review_ids:
-                    add += reviews_obj.rating
-                avg = add / len(obj.seller_review_ids)
-            obj.average_rating = (round(decimal.Decimal(abs(avg)), 2))
+            pub_sum, pub_count = stats.get((obj.id, True), (0, 0))
+            unpub_sum, unpub_count = stats.get((obj.id, False), (0, 0))
+            total_count = pub_count + unpub_count
+            obj.average_rating = round((pub_sum + unpub_sum) / total_count, 2) if total_count else 0.0
+            obj.published_review_count = pub_count
+            obj.published_average_rating = round(pub_sum / pub_count, 2) if pub_count else 0.0
 
     def fetch_active_review(self, seller_id):
         """ Fetch seller active reviews """
@@ -719,49 +752,23 @@ class ResPartner(models.Model):
         else:
             return []
 
+    @api.model
+    def _get_active_review_domain(self, seller_id, filter_by=-1):
+        """ Return domain of seller published reviews, filtered on rating when filter_by is a star value"""
+        domain = [('marketplace_seller_id', '=', seller_id), ('website_published', '=', True)]
+        if filter_by in (1, 2, 3, 4, 5):
+            domain.append(('rating', '=', filter_by))
+        return domain
+
     def fetch_active_review2(self, seller_id, offset=0, limit=False, sort_by="recent", filter_by=-1):
-        """Fetching seller active reviews on the basis of rating"""
-
-        if filter_by == -1:
-            review_ids = self.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), (
-                'website_published', '=', True)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 1:
-            review_ids = self.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 1)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 2:
-            review_ids = self.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 2)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 3:
-            review_ids = self.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 3)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 4:
-            review_ids = self.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 4)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        if filter_by == 5:
-            review_ids = self.env["seller.review"].search([('marketplace_seller_id', '=', seller_id), ('website_published', '=', True), (
-                'rating', '=', 5)], order="helpful desc" if sort_by == "most_helpful" else "create_date desc")
-        return_obj = []
-        if review_ids and offset < len(review_ids):
-            while offset < len(review_ids) and limit != 0:
-                return_obj.append(review_ids[offset])
-                offset += 1
-                limit -= 1
-            return return_obj
-        else:
-            return []
+        """Fetching one page of seller active reviews on the basis of rating"""
+        return self.env["seller.review"].search(
+            self._get_active_review_domain(seller_id, filter_by), offset=offset, limit=limit or None,
+            order="helpful desc, id desc" if sort_by == "most_helpful" else "create_date desc, id desc")
 
     def avg_review(self):
         """ Calculate seller average reviews"""
-        val = 0.0
-        length = 0.0
-        if self._ids:
-            reviews_obj = self.fetch_active_review(self._ids[0])
-            if reviews_obj:
-                for obj in reviews_obj:
-                    val += float(obj.rating)
-                    length = float(len(reviews_obj))
-                return round((val / length), 1)
-        return 0
+        return round(self[:1].sudo().published_average_rating, 1)
 
     def fetch_user_vote(self, seller_review_id):
         """ Fetch seller Voting"""
@@ -803,13 +810,17 @@ class ResPartner(models.Model):
             'domain': "[('marketplace_seller_id','=',%s)]" % self._ids[0],
         }
 
+    def _get_review_star_counts(self):
+        """ Return count of seller published reviews per rating"""
+        self.ensure_one()
+        return dict(self.env["seller.review"].sudo()._read_group(
+            self._get_active_review_domain(self.id), ['rating'], ['__count']))
+
     def total_star_count(self, no_of_star):
         """ Calculate count of seller reviews on the basis of no_of_star"""
         if not no_of_star:
             return 0
-        review_ids = self.env["seller.review"].search(
-            [('marketplace_seller_id', '=', self.id), ('website_published', '=', True), ("rating", "=", no_of_star)])
-        return len(review_ids.ids) if review_ids else 0
+        return self._get_review_star_counts().get(no_of_star, 0)
 
     def total_active_recommendation(self):
         """ calculate count of seller active recommendation"""
@@ -863,12 +874,9 @@ class ResPartner(models.Model):
 
     def seller_sales_count(self):
         """Calculate seller total sales count"""
-        sales_count = 0
         all_products = self.env['product.template'].sudo().search(
             [("marketplace_seller_id", "=", self.sudo().id)])
-        for prod in all_products.with_user(SUPERUSER_ID):
-            sales_count += prod.sales_count
-        return sales_count
+        return sum(all_products.mapped('sales_count'))
 
     def seller_products_count(self):
         """Calculate seller total product count"""
@@ -877,6 +885,37 @@ class ResPartner(models.Model):
             [("marketplace_seller_id", "=", self.sudo().id), ("status",'=','approved'),('website_published', '=', True)])
         return len(all_products)
 
+    def _get_sellers_sales_count(self):
+        """ Return {seller id: total sales count} of the sellers with one grouped sales query, counted like the sales_count
+            of the products: quantities of the confirmed sales of the last 365 days """
+        sales_counts = defaultdict(float)
+        if not self:
+            return sales_counts
+        SaleReport = self.env['sale.report'].sudo()
+        date_from = fields.Datetime.to_string(datetime.combine(fields.Datetime.now() - timedelta(days=365), time.min))
+        for template, product_uom_qty in SaleReport._read_group([
+                ('state', 'in', SaleReport._get_done_states()),
+                ('product_tmpl_id.marketplace_seller_id', 'in', self.ids),
+                ('date', '>=', date_from)], ['product_tmpl_id'], ['product_uom_qty:sum']):
+            sales_counts[template.marketplace_seller_id.id] += float_round(product_uom_qty, precision_rounding=template.uom_id.rounding)
+        return sales_counts
+
+    def _get_seller_card_values(self, with_sales=False):
+        """ Return {seller id: values of the seller card} for a page of the seller directory, computed with the same
+            number of queries whatever the number of sellers of the page """
+        sellers = self.sudo()
+        product_counts = {seller.id: count for seller, count in self.env['product.template'].sudo()._read_group(
+            [("marketplace_seller_id", "in", sellers.ids), ("status", '=', 'approved'), ('website_published', '=', True)],
+            ['marketplace_seller_id'], ['__count'])}
+        sales_counts = sellers._get_sellers_sales_count() if with_sales else {}
+        return {seller.id: {
+            'product_count': product_counts.get(seller.id, 0),
+            'sales_count': sales_counts.get(seller.id, 0),
+            'average_rating': round(seller.published_average_rating, 1),
+            'review_count': seller.published_review_count,
+            'image_url': '/marketplace/image/%s/res.partner/profile_image/256x256?unique=%s' % (seller.id, seller.write_date.timestamp()),
+        } for seller in sellers}
+
     def register_partner_as_a_seller(self):
         """ Register partner as a seller"""
         for rec in self:
@@ -17,29 +17,21 @@
 from odoo import models, fields, api, _
 from odoo.addons.website_sale_stock.models.sale_order import SaleOrder as WebsiteSaleStock
 import logging
+from collections import defaultdict
 _logger = logging.getLogger(__name__)
 
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
 
-    admin_commission = fields.Float(string="Admin commission",compute="_compute_admin_commission",default='0.0')
-    seller_amount = fields.Float(string="Seller amount",compute="_compute_seller_amount",default='0.0')
-
-    def _compute_admin_commission(self):
-        """Compute admin commission"""
-        admin_commission = 0
-        for line in self.order_line:
-            if line.admin_commission:
-                admin_commission = admin_commission+line.admin_commission
-        self.admin_commission = admin_commission
-
-    def _compute_seller_amount(self):
-        """Compute seller amount"""
-        seller_amount = 0
-        for line in self.order_line:
-            if line.seller_amount:
-                seller_amount = seller_amount+line.seller_amount
-        self.seller_amount = seller_amount
+    admin_commission = fields.Float(string="Admin commission", compute="_compute_marketplace_amounts", store=True)
+    seller_amount = fields.Float(string="Seller amount", compute="_compute_marketplace_amounts", store=True)
+
+    @api.depends('order_line.admin_commission', 'order_line.seller_amount')
+    def _compute_marketplace_amounts(self):
+        """Compute admin commission and seller amount from the order lines"""
+        for order in self:
+            order.admin_commission = sum(order.order_line.mapped('admin_commission'))
+            order.seller_amount = sum(order.order_line.mapped('seller_amount'))
 
     def action_cancel(self):
         result = super(SaleOrder,self).action_cancel()
@@ -75,23 +67,69 @@ class SaleOrder(models.Model):
     def action_confirm(self):
         res = super(SaleOrder, self).action_confirm()
         """ Mark Marketplace state to Pending """
-        for rec in self:
-            if rec.order_line:
-                mp_order_line = rec.order_line.filtered(lambda line: line.marketplace_seller_id != False)
-                if mp_order_line:
-                    mp_order_line.write({'marketplace_state':'pending'})
-                    mp_order_line._adding_followers()
-        resConfig = self.env['res.config.settings']
-        if resConfig.get_mp_global_field_value("enable_notify_seller_on_new_order"):
-            temp_id = resConfig.get_mp_global_field_value("notify_seller_on_new_order_m_tmpl_id")
-            if temp_id:
-                template_obj = self.env['mail.template'].browse(temp_id)
-                for order in self:
-                    seller_objs = order.order_line.mapped('marketplace_seller_id')
-                    for seller in seller_objs:
-                        template_obj.with_context(seller=seller).with_company(self.env.company).send_mail(order.id, True)
+        mp_order_line = self.order_line.filtered(lambda line: line.marketplace_seller_id != False)
+        if mp_order_line:
+            mp_order_line.write({'marketplace_state':'pending'})
+            mp_order_line._adding_followers()
+        self._notify_sellers_on_new_order()
         return res
 
+    def _notify_sellers_on_new_order(self):
+        """ Queue new order notifications of sellers in the mail queue, one mail per seller and order or one
+            digest mail per seller when enabled """
+        resConfig = self.env['res.config.settings']
+        if not resConfig.get_mp_global_field_value("enable_notify_seller_on_new_order"):
+            return
+        template_obj = resConfig.get_mp_global_record("notify_seller_on_new_order_m_tmpl_id")
+        if not template_obj:
+            return
+        template_obj = template_obj.with_company(self.env.company)
+        digest = resConfig.get_mp_global_field_value("notify_seller_on_new_order_digest")
+        orders_by_seller = defaultdict(lambda: self.browse())
+        for order in self:
+            for seller in order.order_line.mapped('marketplace_seller_id'):
+                orders_by_seller[seller] |= order
+        for seller, orders in orders_by_seller.items():
+            seller_template = template_obj.with_context(seller=seller)
+            if digest and len(orders) > 1:
+                orders._send_seller_order_digest(seller_template)
+            else:
+                seller_template.send_mail_batch(orders.ids, force_send=False)
+
+    def _send_seller_order_digest(self, template_obj):
+        """ Queue one mail gathering the new order notifications of a seller, recipients, reply to and
+            attachments come from the template like for the single order mails """
+        seller = template_obj._context.get('seller')
+        bodies = template_obj._render_field('body_html', self.ids, compute_lang=True)
+        template_values = template_obj._generate_template(
+            self.ids, ('attachment_ids', 'email_cc', 'email_from', 'email_to', 'mail_server_id', 'partner_to',
+                       'reply_to', 'report_template_ids'), find_or_create_partners=True)
+        first_values = template_values[self[:1].id]
+        partner_ids = set(seller.ids if seller else [])
+        attachment_ids, attachments = set(), []
+        for values in template_values.values():
+            partner_ids.update(values.get('partner_ids', []))
+            attachment_ids.update(values.get('attachment_ids', []))
+            attachments += values.get('attachments', [])
+        lang = seller.lang if seller and seller.lang else template_obj._render_lang(self[:1].ids)[self[:1].id]
+        mail = self.env['mail.mail'].sudo().create({
+            'subject': self.with_context(lang=lang).env._("New Orders %s", ", ".join(self.mapped('name'))),
+            'body_html': '<hr/>'.join(bodies[order.id] for order in self),
+            'email_from': first_values.get('email_from'),
+            'email_to': first_values.get('email_to'),
+            'email_cc': first_values.get('email_cc'),
+            'reply_to': first_values.get('reply_to'),
+            'mail_server_id': first_values.get('mail_server_id'),
+            'recipient_ids': [(4, partner_id) for partner_id in partner_ids],
+            'auto_delete': template_obj.auto_delete,
+        })
+        attachment_vals = [(4, attachment_id) for attachment_id in attachment_ids]
+        attachment_vals += [(0, 0, {'name': name, 'datas': datas, 'type': 'binary', 'res_model': 'mail.message',
+                                    'res_id': mail.mail_message_id.id}) for name, datas in attachments]
+        if attachment_vals:
+            mail.attachment_ids = attachment_vals
+        return mail
+
 
 class SaleOrderLine(models.Model):
     _name = 'sale.order.line'
@@ -168,15 +206,8 @@ class SaleOrderLine(models.Model):
 
     def _adding_followers(self):
         """Add user in follower list"""
-        partner_id = self.env.user.partner_id
-        for rec in self:
-            if not self.env['mail.followers'].search([('res_id','=',rec.id),('res_model','=','sale.order.line'),('partner_id','=',partner_id.id)]):
-                follower_id = self.env['mail.followers'].sudo().create({
-            'res_id':rec.id,
-            'res_model':'sale.order.line',
-            'partner_id':partner_id.id
+        self.sudo().message_subscribe(partner_ids=self.env.user.partner_id.ids)
 
-                })
     def send_mail_less(self):
         resConfig = self.env['res.config.settings']
         if resConfig.get_mp_global_field_value("enable_notify_seller_on_new_order"):
@@ -31,33 +31,43 @@ class SellerPayment(models.Model):
 
     @api.model
     def _get_mp_currency(self):
-        return self.env['ir.default']._get('res.config.settings', 'mp_currency_id') or self.env.user.company_id.currency_id
+        return self.env['res.config.settings'].get_mp_global_record('mp_currency_id')
 
+    @api.depends("payment_mode", "memo", "seller_id", "invoice_id")
     def _check_all_move_line_status(self):
-        """ Compute cashable field"""
+        """ Compute cashable field, a payment is cashable when all deliveries of its order are done
+            or when it is invoiced. Moves of all payments are fetched with a single search. """
+        order_payments = self.filtered(lambda rec: rec.payment_mode == "order_paid" and rec.memo)
+        pending_moves = set()
+        if order_payments:
+            stock_move_objs = self.env["stock.move"].search([
+                ('origin', 'in', list(set(order_payments.mapped('memo')))),
+                ('marketplace_seller_id', 'in', order_payments.seller_id.ids),
+                ('state', '!=', 'done')])
+            pending_moves = {(move.origin, move.marketplace_seller_id.id) for move in stock_move_objs}
         for rec in self:
             flag = False
             if rec.payment_mode == "order_paid":
-                if rec.memo:
-                    stock_move_objs = self.env["stock.move"].search(
-                        [('origin', '=', rec.memo), ('product_id.marketplace_seller_id', '=', rec.seller_id.id)])
-                    if all(move.state == 'done' for move in stock_move_objs):
-                        flag = True
+                if rec.memo and (rec.memo, rec.seller_id.id) not in pending_moves:
+                    flag = True
                 if not flag and rec.invoice_id:
                     flag = True
             rec.is_cashable = flag
 
-    def _make_it_searchable(self, operator, value):
-        """ Return list of ids of cashable payments """
-        self.env.cr.execute("""SELECT id FROM seller_payment""")
-        all_seller_payment_ids = []
-        ids = []
-        for dic in self.env.cr.dictfetchall():
-            all_seller_payment_ids.append(dic["id"])
-        for obj in self.sudo().browse(all_seller_payment_ids):
-            if obj.is_cashable:
-                ids.append(obj.id)
-        return [('id', 'in', ids)]
+    def _get_cashable_payments_for_moves(self, moves):
+        """ Return the order payments of the sellers of the moves linked with them by origin """
+        moves = moves.filtered(lambda move: move.origin and move.marketplace_seller_id)
+        if not moves:
+            return self.browse()
+        return self.sudo().search([('payment_mode', '=', 'order_paid'), ('memo', 'in', list(set(moves.mapped('origin')))),
+            ('seller_id', 'in', moves.marketplace_seller_id.ids)])
+
+    def _recompute_cashable_for_moves(self, moves):
+        """ Recompute cashable field of the order payments linked with moves created, done or deleted, the only
+            changes of a move deciding whether it is pending or not """
+        payments = self._get_cashable_payments_for_moves(moves)
+        if payments:
+            self.env.add_to_compute(self._fields['is_cashable'], payments)
 
     name = fields.Char(string="Record Reference",
                        default="NEW", translate=True, readonly=True, copy=False)
@@ -77,8 +87,8 @@ class SellerPayment(models.Model):
     invoice_id = fields.Many2one("account.move", string="Invoice", readonly=True, copy=False)
     payable_amount = fields.Float(string="Payable Amount", required=True,
                                   help="Positive amount means vendor will pay to seller & negative amount means vendor has been paid/or seller have to refund.", readonly=True, copy=False)
-    memo = fields.Char(string="Memo", copy=False)
-    is_cashable = fields.Boolean(compute="_check_all_move_line_status", string="Cashable", search='_make_it_searchable',
+    memo = fields.Char(string="Memo", copy=False, index=True)
+    is_cashable = fields.Boolean(compute="_check_all_move_line_status", string="Cashable", store=True, index=True,
                                  help="If all delivery releted to the order have been delivered then seller will be able to get payment.")
     company_id = fields.Many2one('res.company', string='Company', default=lambda self: self.env.user.company_id.id, readonly=True)
     invoice_currency_id = fields.Many2one('res.currency', string="Invoice Currency", compute="_set_invoice_currency", store=True, tracking=True)
@@ -103,7 +113,7 @@ class SellerPayment(models.Model):
     #Compute functions
     @api.depends("invoice_id", "invoice_id.currency_id")
     def _set_invoice_currency(self):
-        self.invoice_currency_id = self.invoice_id.currency_id or self.env['ir.default']._get('res.config.settings', 'mp_currency_id') or self.env.user.company_id.currency_id
+        self.invoice_currency_id = self.invoice_id.currency_id or self._get_mp_currency()
     
     @api.depends("seller_id")
     def _set_seller_commission(self):
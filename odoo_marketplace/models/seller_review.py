@@ -115,7 +115,7 @@ class SellerReview(models.Model):
     rating = fields.Integer(string='Rating', default=1, copy=False)
     rating2 = fields.Integer(compute="_get_rating", string="Rating2", copy=False)
     email = fields.Char(string='Email', default=_get_mail, copy=False)
-    marketplace_seller_id = fields.Many2one('res.partner', string='Seller', domain=[('seller', '=', True),('state', '=', 'approved')])
+    marketplace_seller_id = fields.Many2one('res.partner', string='Seller', domain=[('seller', '=', True),('state', '=', 'approved')], index=True)
     create_date = fields.Datetime(string='Created Date')
     helpful = fields.Integer(compute='_set_total_helpful',
                              string='Helpful', store=True)
@@ -66,11 +66,13 @@ class SellerShop(models.Model):
         min_sequence = self._cr.fetchone()[0]
         return min_sequence and min_sequence - 1 or 10
 
-    name = fields.Char(string="Shop Name",  translate=True, copy=False)
+    name = fields.Char(string="Shop Name",  translate=True, copy=False, index='trigram')
     shop_logo = fields.Binary(string="Image",
                               help="This field holds the image used as image for the product, limited to 1024x1024px.")
     shop_banner = fields.Binary(string="Shop Banner")
-    description = fields.Text(string="Description",  translate=True)
+    shop_logo_512 = fields.Image(related="shop_logo", max_width=512, max_height=512, store=True, string="Image 512")
+    shop_banner_1024 = fields.Image(related="shop_banner", max_width=1024, max_height=1024, store=True, string="Shop Banner 1024")
+    description = fields.Text(string="Description",  translate=True, index='trigram')
     street = fields.Char(string='Street', copy=False)
     street2 = fields.Char(string='Street2', copy=False)
     zip = fields.Char(string='Zip', size=24, change_default=True, copy=False)
@@ -185,6 +187,20 @@ class SellerShop(models.Model):
             sales_count += prod.sales_count
         return sales_count
 
+    def _get_shop_card_values(self, with_sales=False):
+        """ Return {shop id: values of the shop card} for a page of the shop directory, computed with the same
+            number of queries whatever the number of shops of the page """
+        shops = self.sudo()
+        published_products = shops.seller_product_ids.filtered('website_published')
+        sales_counts = shops.seller_id._get_sellers_sales_count() if with_sales else {}
+        return {shop.id: {
+            'product_count': len(shop.seller_product_ids & published_products),
+            'sales_count': sales_counts.get(shop.seller_id.id, 0),
+            'average_rating': round(shop.seller_id.published_average_rating, 1),
+            'review_count': shop.seller_id.published_review_count,
+            'image_url': '/marketplace/image/%s/seller.shop/shop_logo/300x300?unique=%s' % (shop.id, shop.write_date.timestamp()),
+        } for shop in shops}
+
     def _get_website_ribbon(self):
         return self.website_ribbon_id
 
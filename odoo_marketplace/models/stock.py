@@ -15,15 +15,23 @@
 # If not, see <https://store.webkul.com/license.html/>
 #################################################################################
 
-from odoo import models, fields, api, _, SUPERUSER_ID
+from odoo import models, fields, api, tools, _, SUPERUSER_ID
 from lxml import etree
 from datetime import datetime
 from odoo.tools.translate import _
 from odoo.exceptions import ValidationError
+from odoo.tools import split_every
+from markupsafe import Markup
 from .mp_tools import *
+from contextvars import ContextVar
 import logging
 _logger = logging.getLogger(__name__)
 
+MP_STOCK_APPLY_CHUNK_SIZE = 500  # quants applied per inventory apply
+MP_OPEN_PICKING_STATES = ['draft', 'confirmed', 'waiting', 'partially_available', 'assigned']
+# {assignation key: picking id or False} of the moves being assigned by StockMove._assign_picking
+MP_OPEN_PICKINGS = ContextVar('mp_open_pickings', default=None)
+
 
 class MarketplaceStock(models.Model):
     _name = "marketplace.stock"
@@ -147,13 +155,25 @@ class MarketplaceStock(models.Model):
         self._approve()
 
     def _approve(self):
-        """ Approve inventory request"""
-        for obj in self:
-            if obj.state == "requested" and obj.product_id.status == "approved" and obj.product_id.marketplace_seller_id.state == "approved":
-                obj.change_product_qty()
-                obj.write({"state": "approved"})
-            else:
-                _logger.warning("warning !!MP inventory request can not be approved. Inventory request not in requested state or product is not approved or product seller is not approved.-")
+        """ Approve inventory requests in batch: quantities are applied per chunk and every seller is notified once"""
+        approvable = self.filtered(lambda obj: obj.state == "requested" and obj.product_id.status == "approved" and obj.product_id.marketplace_seller_id.state == "approved")
+        if self - approvable:
+            _logger.warning("warning !!MP inventory requests %s can not be approved. Inventory request not in requested state or product is not approved or product seller is not approved.-", (self - approvable).ids)
+        if not approvable:
+            return
+        approvable.change_product_qty()
+        approvable.write({"state": "approved"})
+        approvable._notify_sellers_approved()
+
+    def _notify_sellers_approved(self):
+        """ Post one message per seller listing its approved inventory requests"""
+        for seller, requests in self.grouped('marketplace_seller_id').items():
+            if not seller:
+                continue
+            lines = Markup().join(Markup("<li>%s: %s (%s)</li>") % (obj.product_id.display_name, obj.new_quantity, obj.location_id.display_name) for obj in requests)
+            seller.sudo().message_post(
+                body=Markup("<p>%s</p><ul>%s</ul>") % (_("Your inventory requests have been approved."), lines),
+                partner_ids=seller.ids, subtype_xmlid='mail.mt_comment')
 
     @check_mp_officer
     def reject(self):
@@ -170,31 +190,35 @@ class MarketplaceStock(models.Model):
 
     def request(self):
         """ Change inventory state to requested """
-        for obj in self:
-            if obj.new_quantity < 0:
-                raise ValidationError(_("Quantity cannot be negative."))
-            obj.state = "requested"
-            obj.auto_approve()
+        if any(obj.new_quantity < 0 for obj in self):
+            raise ValidationError(_("Quantity cannot be negative."))
+        self.write({"state": "requested"})
+        self.auto_approve()
 
     def auto_approve(self):
         """ Approve inventory state if auto_approve_qty field is true"""
-        for obj in self:
-            if obj.marketplace_seller_id.get_seller_global_fields('auto_approve_qty'):
-                obj.with_user(SUPERUSER_ID)._approve()
+        auto_approve_qty = self.marketplace_seller_id.get_sellers_global_fields('auto_approve_qty')
+        self.filtered(lambda obj: auto_approve_qty.get(obj.marketplace_seller_id.id)).with_user(SUPERUSER_ID)._approve()
 
     def change_product_qty(self):
-        """ Create stock.quant record and change product quantity"""
-        for template_obj in self:
-            if not self.env.user.has_group('stock.group_stock_manager'):
-                raise UserError(_('Only inventory administrator has access to update the quantity.'))
-            if template_obj.new_quantity < 0:
-                raise ValidationError(_('Initial Quantity can not be negative'))
-            vals = {
-                'product_id': template_obj.product_id.id,
-                'inventory_quantity' : template_obj.new_quantity,
-                'location_id': template_obj.location_id.id,
-            }
-            self.env['stock.quant'].with_context(inventory_mode=True).create(vals).action_apply_inventory()
+        """ Create stock.quant records and change products quantity. Requests are netted per product and location,
+            the latest request sets the quantity, and the quants are applied by chunk"""
+        if not self:
+            return
+        if not self.env.user.has_group('stock.group_stock_manager'):
+            raise UserError(_('Only inventory administrator has access to update the quantity.'))
+        if any(obj.new_quantity < 0 for obj in self):
+            raise ValidationError(_('Initial Quantity can not be negative'))
+        quantities = {}
+        for obj in self.sorted('id'):
+            quantities[obj.product_id.id, obj.location_id.id] = obj.new_quantity
+        StockQuant = self.env['stock.quant'].with_context(inventory_mode=True)
+        for chunk in split_every(MP_STOCK_APPLY_CHUNK_SIZE, quantities.items()):
+            StockQuant.create([{
+                'product_id': product_id,
+                'inventory_quantity': new_quantity,
+                'location_id': location_id,
+            } for (product_id, location_id), new_quantity in chunk]).action_apply_inventory()
 
     def disable_seller_all_inventory_requests(self, seller_id):
         """ Reject seller all inventory requests"""
@@ -209,6 +233,11 @@ class StockPicking(models.Model):
 
     marketplace_seller_id = fields.Many2one("res.partner", string="Seller")
 
+    def init(self):
+        """ Index the lookup of the open picking of a group of moves, see StockMove._search_picking_for_assignation """
+        tools.create_index(self.env.cr, 'stock_picking_mp_assignation_index', self._table,
+                           ['group_id', 'marketplace_seller_id', 'location_id', 'location_dest_id', 'picking_type_id'])
+
     @api.model
     def _read_group_fill_results( self, domain, groupby, remaining_groupbys,
         aggregated_fields, read_group_order=None):
@@ -288,22 +317,70 @@ class StockMove(models.Model):
     def _key_assign_picking(self):
         self.ensure_one()
         res = super(StockMove, self)._key_assign_picking()
-        res = res + (self.product_id.marketplace_seller_id, )
+        res = res + (self.marketplace_seller_id, )
         return res
 
+    def _get_picking_assignation_key(self):
+        """ Return the ids the open picking of the move is searched by """
+        self.ensure_one()
+        return (self.group_id.id, self.location_id.id, self.location_dest_id.id, self.picking_type_id.id, self.marketplace_seller_id.id)
+
+    def _get_open_pickings_for_assignation(self):
+        """ Return {assignation key: picking id or False} for the keys of all the moves, the open pickings
+            are found with one query """
+        if not self:
+            return {}
+        open_pickings = dict.fromkeys([move._get_picking_assignation_key() for move in self], False)
+        group_ids = self.group_id.ids + ([False] if not all(self.mapped('group_id')) else [])
+        for picking in self.env['stock.picking'].search([
+                ('group_id', 'in', group_ids),
+                ('location_id', 'in', self.location_id.ids),
+                ('location_dest_id', 'in', self.location_dest_id.ids),
+                ('picking_type_id', 'in', self.picking_type_id.ids),
+                ('marketplace_seller_id', 'in', self.marketplace_seller_id.ids + [False]),
+                ('printed', '=', False),
+                ('state', 'in', MP_OPEN_PICKING_STATES)]):
+            key = (picking.group_id.id, picking.location_id.id, picking.location_dest_id.id, picking.picking_type_id.id, picking.marketplace_seller_id.id)
+            if key in open_pickings and not open_pickings[key]:
+                open_pickings[key] = picking.id
+        return open_pickings
+
+    def _assign_picking(self):
+        """ Resolve the open pickings of all the groups of moves at once before assigning them, they are kept
+            out of the context so that they never reach the moves and pickings written meanwhile """
+        token = MP_OPEN_PICKINGS.set(self._get_open_pickings_for_assignation())
+        try:
+            return super(StockMove, self)._assign_picking()
+        finally:
+            MP_OPEN_PICKINGS.reset(token)
+
     def _search_picking_for_assignation(self):
         """ Add marketplace seller id in search domain """
         self.ensure_one()
+        open_pickings = MP_OPEN_PICKINGS.get() or {}
+        key = self._get_picking_assignation_key()
+        if key in open_pickings:
+            picking = self.env['stock.picking'].browse(open_pickings[key])
+            if not picking or (not picking.printed and picking.state in MP_OPEN_PICKING_STATES):
+                return picking
         picking = self.env['stock.picking'].search([
                 ('group_id', '=', self.group_id.id),
                 ('location_id', '=', self.location_id.id),
                 ('location_dest_id', '=', self.location_dest_id.id),
                 ('picking_type_id', '=', self.picking_type_id.id),
-                ('marketplace_seller_id', '=', self.product_id.marketplace_seller_id.id),
+                ('marketplace_seller_id', '=', self.marketplace_seller_id.id),
                 ('printed', '=', False),
-                ('state', 'in', ['draft', 'confirmed', 'waiting', 'partially_available', 'assigned'])], limit=1)
+                ('state', 'in', MP_OPEN_PICKING_STATES)], limit=1)
         return picking
 
+    def _assign_picking_post_process(self, new=False):
+        """ Keep the picking created for a group of moves as the open picking of its assignation key """
+        res = super(StockMove, self)._assign_picking_post_process(new=new)
+        open_pickings = MP_OPEN_PICKINGS.get()
+        if new and open_pickings is not None and self:
+            open_pickings[self[0]._get_picking_assignation_key()] = self[0].picking_id.id
+        return res
+
     def _get_new_picking_values(self):
         """ Return create values for new picking that will be linked with group
         of moves in self.
@@ -316,16 +393,51 @@ class StockMove(models.Model):
         })
         return values
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        moves = super(StockMove, self).create(vals_list)
+        self.env['seller.payment']._recompute_cashable_for_moves(moves)
+        return moves
+
+    def _action_done(self, cancel_backorder=False):
+        moves = super(StockMove, self)._action_done(cancel_backorder=cancel_backorder)
+        self.env['seller.payment']._recompute_cashable_for_moves(self | moves)
+        return moves
+
+    def unlink(self):
+        payments = self.env['seller.payment']._get_cashable_payments_for_moves(self)
+        result = super(StockMove, self).unlink()
+        if payments:
+            self.env.add_to_compute(payments._fields['is_cashable'], payments)
+        return result
+
     def write(self, values):
         result = super(StockMove, self).write(values)
-        for rec in self:
-            if rec.state == "cancel":
-                sol_obj = self.env["sale.order.line"].sudo().search([('order_id.name', '=', rec.origin), ('product_id', '=', rec.product_id.id)], limit=1)
-                if sol_obj:
-                    sol_obj.marketplace_state = "cancel"
-            if rec.state == "done" and rec.sale_line_id:
-                if rec.sale_line_id.qty_delivered == rec.sale_line_id.product_uom_qty:
-                    rec.sale_line_id.marketplace_state = 'shipped'
-                else:
-                    rec.sale_line_id.marketplace_state = 'approved'
+        if 'state' in values:
+            self._sync_marketplace_line_state()
         return result
+
+    def _sync_marketplace_line_state(self):
+        """ Propagate cancelled and done moves state on their sale order lines, one write per target state"""
+        cancelled_moves = self.filtered(lambda move: move.state == "cancel")
+        done_lines = self.filtered(lambda move: move.state == "done").sale_line_id
+        if not cancelled_moves and not done_lines:
+            return
+        cancelled_lines = cancelled_moves.sale_line_id.sudo()
+        moves_without_line = cancelled_moves.filtered(lambda move: not move.sale_line_id and move.origin)
+        if moves_without_line:
+            sol_by_key = {}
+            for sol_obj in self.env["sale.order.line"].sudo().search([
+                    ('order_id.name', 'in', list(set(moves_without_line.mapped('origin')))),
+                    ('product_id', 'in', moves_without_line.product_id.ids)]):
+                sol_by_key.setdefault((sol_obj.order_id.name, sol_obj.product_id.id), sol_obj)
+            for move in moves_without_line:
+                cancelled_lines |= sol_by_key.get((move.origin, move.product_id.id), cancelled_lines.browse())
+        cancelled_lines -= done_lines
+        if cancelled_lines:
+            cancelled_lines.write({'marketplace_state': 'cancel'})
+        shipped_lines = done_lines.filtered(lambda line: line.qty_delivered == line.product_uom_qty)
+        if shipped_lines:
+            shipped_lines.write({'marketplace_state': 'shipped'})
+        if done_lines - shipped_lines:
+            (done_lines - shipped_lines).write({'marketplace_state': 'approved'})
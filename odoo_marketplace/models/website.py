@@ -86,7 +86,7 @@ class Website(models.Model):
     @api.model
     def get_group_mp_shop_allow(self):
         """ Get group_mp_shop_allow field """
-        return self.env['ir.default'].sudo()._get('res.config.settings', 'group_mp_shop_allow')
+        return self.env['res.config.settings'].sudo().get_mp_global_field_value('group_mp_shop_allow')
 
     @api.model
     def get_mp_ajax_seller_countries(self):
@@ -116,7 +116,6 @@ class Website(models.Model):
     def _search_with_fuzzy(self, search_type, search, limit, order, options):
         """Update searching data for seller/shop"""
         res = super()._search_with_fuzzy(search_type, search, limit, order, options)
-        self.env.registry.clear_cache()
         url = request.httprequest.referrer
         url2 = request.httprequest.path
 
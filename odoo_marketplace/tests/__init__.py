@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from . import test_seller_order_digest
+from . import test_seller_payment
+from . import test_seller_settlement
+from . import test_marketplace_stock
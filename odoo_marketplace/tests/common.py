@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase
+
+
+class MarketplaceCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.seller = cls.env['res.partner'].create({
+            'name': 'Test Seller', 'email': 'seller@example.com', 'seller': True, 'state': 'approved'})
+        cls.customer = cls.env['res.partner'].create({'name': 'Test Customer', 'email': 'customer@example.com'})
+        cls.mp_product = cls.env['product.product'].create({
+            'name': 'Seller Product', 'type': 'consu', 'list_price': 100.0, 'marketplace_seller_id': cls.seller.id,
+            'status': 'approved'})
+
+    @classmethod
+    def _create_order(cls, qty=1.0):
+        return cls.env['sale.order'].create({
+            'partner_id': cls.customer.id,
+            'order_line': [(0, 0, {'product_id': cls.mp_product.id, 'product_uom_qty': qty})],
+        })
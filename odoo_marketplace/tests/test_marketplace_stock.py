@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+from .common import MarketplaceCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMarketplaceStock(MarketplaceCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.mp_product.is_storable = True
+        cls.stock_location = cls.env.ref('stock.stock_location_stock')
+        cls.shelf_location = cls.env['stock.location'].create({
+            'name': 'Seller Shelf', 'usage': 'internal', 'location_id': cls.stock_location.id})
+
+    def _create_request(self, quantity, location, state='requested'):
+        return self.env['marketplace.stock'].create({
+            'product_id': self.mp_product.id, 'product_temp_id': self.mp_product.product_tmpl_id.id,
+            'new_quantity': quantity, 'location_id': location.id, 'state': state})
+
+    def _get_quantity(self, location):
+        return self.env['stock.quant']._get_available_quantity(self.mp_product, location, strict=True)
+
+    def test_approve_nets_requests(self):
+        """ Requests of one product and location are netted, the latest request sets the quantity """
+        requests = self._create_request(5, self.stock_location) | self._create_request(8, self.stock_location) \
+            | self._create_request(3, self.shelf_location)
+        requests._approve()
+        self.assertEqual(set(requests.mapped('state')), {'approved'})
+        self.assertEqual(self._get_quantity(self.stock_location), 8)
+        self.assertEqual(self._get_quantity(self.shelf_location), 3)
+
+    def test_approve_skips_other_states(self):
+        """ Draft requests are not approved and do not change the quantity """
+        draft_request = self._create_request(4, self.stock_location, state='draft')
+        request = self._create_request(2, self.shelf_location)
+        (draft_request | request)._approve()
+        self.assertEqual(draft_request.state, 'draft')
+        self.assertEqual(request.state, 'approved')
+        self.assertEqual(self._get_quantity(self.stock_location), 0)
+
+    def test_approve_notifies_seller_once(self):
+        """ The seller receives one message listing all its approved requests """
+        requests = self._create_request(5, self.stock_location) | self._create_request(3, self.shelf_location)
+        messages_before = self.seller.message_ids
+        requests._approve()
+        messages = self.seller.message_ids - messages_before
+        self.assertEqual(len(messages), 1)
+        self.assertIn(self.shelf_location.display_name, messages.body)
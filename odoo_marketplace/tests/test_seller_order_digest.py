@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+from .common import MarketplaceCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSellerOrderDigest(MarketplaceCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        IrDefault = cls.env['ir.default']
+        IrDefault.set('res.config.settings', 'enable_notify_seller_on_new_order', True)
+        IrDefault.set('res.config.settings', 'notify_seller_on_new_order_m_tmpl_id',
+                      cls.env.ref('odoo_marketplace.marketplace_template_for_order_to_seller').id)
+        cls.orders = cls._create_order() | cls._create_order(2.0)
+
+    def _get_seller_mails(self):
+        return self.env['mail.mail'].sudo().search([('recipient_ids', 'in', self.seller.ids)])
+
+    def test_one_mail_per_order(self):
+        """ Without digest every order queues its own mail to the seller """
+        self.env['ir.default'].set('res.config.settings', 'notify_seller_on_new_order_digest', False)
+        self.orders._notify_sellers_on_new_order()
+        mails = self.env['mail.mail'].sudo().search([('model', '=', 'sale.order'), ('res_id', 'in', self.orders.ids)])
+        self.assertEqual(len(mails), 2)
+        self.assertTrue(all(self.seller.email in mail.email_to for mail in mails))
+
+    def test_digest_mail(self):
+        """ With digest the seller receives one mail listing all the orders """
+        self.env['ir.default'].set('res.config.settings', 'notify_seller_on_new_order_digest', True)
+        self.orders._notify_sellers_on_new_order()
+        mails = self._get_seller_mails()
+        self.assertEqual(len(mails), 1)
+        for order in self.orders:
+            self.assertIn(order.name, mails.subject)
+            self.assertIn(order.name, mails.body_html)
+        self.assertEqual(mails.recipient_ids, self.seller)
+        self.assertTrue(mails.email_from)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+from .common import MarketplaceCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSellerPayment(MarketplaceCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stock_location = cls.env.ref('stock.stock_location_stock')
+        cls.customer_location = cls.env.ref('stock.stock_location_customers')
+
+    def _create_payment(self, memo, amount=100.0, payment_mode='order_paid', state='confirm'):
+        return self.env['seller.payment'].with_context(pass_create_validation=True).create({
+            'seller_id': self.seller.id, 'memo': memo, 'payable_amount': amount, 'payment_mode': payment_mode,
+            'payment_type': 'cr' if payment_mode == 'order_paid' else 'dr', 'state': state})
+
+    def _create_move(self, origin):
+        move = self.env['stock.move'].create({
+            'name': self.mp_product.name, 'origin': origin, 'product_id': self.mp_product.id, 'product_uom_qty': 1,
+            'product_uom': self.mp_product.uom_id.id, 'location_id': self.stock_location.id,
+            'location_dest_id': self.customer_location.id})
+        move._action_confirm()
+        return move
+
+    def _set_move_done(self, move):
+        move.quantity = move.product_uom_qty
+        move.picked = True
+        move._action_done()
+
+    def test_cashable_follows_moves(self):
+        """ Order payments become cashable once all the moves of their order are done """
+        payment = self._create_payment('MP/TEST/001')
+        self.assertTrue(payment.is_cashable)
+        move = self._create_move('MP/TEST/001')
+        self.assertFalse(payment.is_cashable)
+        self._set_move_done(move)
+        self.assertTrue(payment.is_cashable)
+
+    def test_cashable_on_move_unlink(self):
+        """ Deleting the pending move of an order makes its payment cashable again """
+        payment = self._create_payment('MP/TEST/002')
+        move = self._create_move('MP/TEST/002')
+        self.assertFalse(payment.is_cashable)
+        move._action_cancel()
+        self.assertFalse(payment.is_cashable)
+        move.unlink()
+        self.assertTrue(payment.is_cashable)
+
+    def test_cashable_other_order(self):
+        """ Moves of another order do not change the payment """
+        payment = self._create_payment('MP/TEST/003')
+        self._create_move('MP/TEST/004')
+        self.assertTrue(payment.is_cashable)
+        self.assertTrue(self.env['seller.payment'].search([('id', '=', payment.id), ('is_cashable', '=', True)]))
+
+    def test_partner_payment_totals(self):
+        """ Stored seller totals follow the payments of the seller """
+        self._create_payment('MP/TEST/010', 100.0)
+        pending_payment = self._create_payment('MP/TEST/011', 50.0)
+        self._create_move('MP/TEST/011')
+        self._create_payment('MP/TEST/012', 500.0, state='draft')
+        self.assertEqual(self.seller.total_mp_payment, 150.0)
+        self.assertEqual(self.seller.cashable_amount, 100.0)
+        self.assertEqual(self.seller.paid_mp_payment, 0.0)
+        self._create_payment('PAY/TEST/001', 40.0, payment_mode='seller_payment', state='posted')
+        self.assertEqual(self.seller.paid_mp_payment, 40.0)
+        self.assertEqual(self.seller.cashable_amount, 60.0)
+        self.assertEqual(self.seller.balance_mp_payment, 110.0)
+        pending_payment.write({'state': 'canceled'})
+        self.assertEqual(self.seller.total_mp_payment, 100.0)
+        self.assertEqual(self.seller.available_amount, 60.0)
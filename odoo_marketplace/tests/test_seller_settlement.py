@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestSellerSettlement(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.seller = cls.env['res.partner'].create({
+            'name': 'Test Seller', 'email': 'seller@example.com', 'seller': True, 'state': 'approved',
+            'set_seller_wise_settings': True, 'commission': 10.0})
+        cls.mp_product = cls.env['product.product'].create({
+            'name': 'Seller Product', 'type': 'consu', 'list_price': 100.0, 'marketplace_seller_id': cls.seller.id,
+            'status': 'approved', 'taxes_id': [(6, 0, [])]})
+
+    def _create_invoice(self, origin, price=100.0):
+        invoice = self.init_invoice('out_invoice', partner=self.partner_a, products=self.mp_product, amounts=[price],
+                                    taxes=self.env['account.tax'])
+        invoice.invoice_origin = origin
+        return invoice
+
+    def _get_order_payments(self, memo):
+        return self.env['seller.payment'].search([('memo', '=', memo), ('seller_id', '=', self.seller.id),
+                                                  ('payment_mode', '=', 'order_paid')])
+
+    def test_settlement_per_invoice(self):
+        """ Every invoice of another order gets its own seller payment and the lines their commission """
+        invoices = self._create_invoice('MP/SETTLE/001') | self._create_invoice('MP/SETTLE/002', 200.0)
+        invoices.create_seller_invoice_new()
+        payment_1 = self._get_order_payments('MP/SETTLE/001')
+        payment_2 = self._get_order_payments('MP/SETTLE/002')
+        self.assertEqual(len(payment_1), 1)
+        self.assertEqual(payment_1.invoiced_amount, 90.0)
+        self.assertEqual(payment_1.state, 'confirm')
+        self.assertEqual(payment_2.invoiced_amount, 180.0)
+        self.assertEqual(invoices[0].invoice_line_ids.seller_commission, 10.0)
+
+    def test_settlement_same_memo(self):
+        """ Invoices of the same order settled in one batch share one seller payment like sequential settlements """
+        invoices = self._create_invoice('MP/SETTLE/003') | self._create_invoice('MP/SETTLE/003')
+        invoices.create_seller_invoice_new()
+        payment = self._get_order_payments('MP/SETTLE/003')
+        self.assertEqual(len(payment), 1)
+        self.assertEqual(payment.invoice_id, invoices[1])
+
+    def test_settlement_existing_payment(self):
+        """ A pending payment of the order is linked to the invoice instead of creating a new one """
+        invoice = self._create_invoice('MP/SETTLE/004')
+        invoice.create_seller_invoice_new()
+        second_invoice = self._create_invoice('MP/SETTLE/004')
+        second_invoice.create_seller_invoice_new()
+        payment = self._get_order_payments('MP/SETTLE/004')
+        self.assertEqual(len(payment), 1)
+        self.assertEqual(payment.invoice_id, second_invoice)